@@ -1,23 +1,23 @@
 import os
 import ssl
 import re
-import json
-import requests
 import streamlit as st
-from http.cookiejar import MozillaCookieJar
-from xml.parsers.expat import ExpatError
-import xml.etree.ElementTree as ET
-from pytube import Playlist
 
 # Import core functions from your module
 from core.transcript_scraper import (
     create_http_client,
-    get_video_id,
-    fetch_transcript,
-    format_output,
-    save_output
+    set_http_client,
+    language_chain,
+    set_response_cache
 )
-from core.project_manager import ProjectManager
+from core.blob_store import BlobStore
+from core.job_runner import JobRunner, QUEUED, RUNNING
+from core.manifest import DONE
+from core.metrics import get_metrics
+from core.project_manager import DEFAULT_SETTINGS, ProjectManager
+from core.response_cache import ResponseCache
+from core.search_index import SearchIndex
+from core.stats_index import StatsIndex
 from core.dashboard import (
     get_project_level_stats,
     get_subproject_level_stats
@@ -45,11 +45,21 @@ connection_option = st.sidebar.radio(
 )
 st.session_state.use_tor = connection_option == "Use Tor (Privacy Enhanced)"
 
+# ─── Initialize HTTP client ────────────────────────────────────────────────
+# The session (with its keep-alive pool), cookies and the Tor probe result are
+# cached across reruns; they are rebuilt after the TTL or on "Refresh Connection".
+CLIENT_TTL_SECONDS = 600
+
+@st.cache_resource(ttl=CLIENT_TTL_SECONDS, show_spinner="Connecting…")
+def get_http_client(use_tor: bool):
+    return create_http_client(use_tor=use_tor)
+
 if st.sidebar.button("Refresh Connection"):
+    get_http_client.clear()
     st.rerun()
 
-# ─── Initialize HTTP client ────────────────────────────────────────────────
-http_session, connection_status = create_http_client(use_tor=st.session_state.use_tor)
+http_session, connection_status = get_http_client(st.session_state.use_tor)
+set_http_client(http_session)
 
 # ─── Add Connection Status Indicator to Sidebar ────────────────────────────
 st.sidebar.markdown("---")
@@ -72,12 +82,55 @@ if connection_status["cookies_loaded"]:
 st.sidebar.markdown("---")
 
 # ─── Application Mode ─────────────────────────────────────────────────────
-mode = st.sidebar.radio("Mode", ["Scraper", "Dashboard"])
+mode = st.sidebar.radio("Mode", ["Scraper", "Dashboard", "Search"])
 
 # ─── Common Sidebar: Projects & Subprojects ───────────────────────────────
 OUTPUT_ROOT = "output"
 pm = ProjectManager(OUTPUT_ROOT)
 os.makedirs(OUTPUT_ROOT, exist_ok=True)
+# Creates output/.stats.sqlite so save_output keeps dashboard stats current
+StatsIndex(OUTPUT_ROOT)
+# Likewise output/.search.sqlite for full-text search
+search_index = SearchIndex(OUTPUT_ROOT)
+# Re-fetches within a week are served from output/.responses.sqlite, and
+# identical transcripts share one file via output/.blobs
+set_response_cache(ResponseCache(OUTPUT_ROOT))
+blob_store = BlobStore(OUTPUT_ROOT)
+metrics = get_metrics()
+
+# Dashboard stats are reconciled with the files on disk at most this often
+STATS_RESCAN_SECONDS = 3600
+
+@st.cache_data(ttl=STATS_RESCAN_SECONDS, show_spinner="Scanning transcripts…")
+def rescan_stats(output_root: str) -> int:
+    return StatsIndex(output_root).refresh()
+
+# Scraping runs on background workers shared by every session of this
+# server; jobs are queued in output/.jobs.sqlite and survive restarts.
+JOB_POLL_SECONDS = 2
+
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(OUTPUT_ROOT, workers=2).start()
+
+job_runner = get_job_runner()
+job_queue = job_runner.queue
+
+
+def render_throughput(container) -> None:
+    """Live pipeline numbers over the last minute: throughput, latency, blocks, fallbacks."""
+    fetch_rows = {row["stage"]: row for row in metrics.stage_summary()}
+    fetches = metrics.rate("fetch", 60)
+    blocked = metrics.rate("fetch", 60, outcome="blocked")
+    with container.container():
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Saved / min", f"{metrics.rate('save', 60) * 60:.1f}")
+        c2.metric("Fetch p50 / p95", f"{fetch_rows.get('fetch', {}).get('p50', 0):.2f}s / "
+                                     f"{fetch_rows.get('fetch', {}).get('p95', 0):.2f}s")
+        c3.metric("Blocked (1 min)", f"{blocked / fetches:.0%}" if fetches else "–")
+        c4.metric("Fallbacks / cache hits",
+                  f"{int(metrics.counter('transcript_stage_total', stage='fallback'))} / "
+                  f"{int(metrics.counter('response_cache_requests_total', result='hit'))}")
 
 # Session state defaults
 for key in ("current_project", "current_subproject", "adding_project", "adding_subproject"):
@@ -132,6 +185,45 @@ if st.session_state.current_project:
             if st.button("Cancel Sub", key="cancel_sub"):
                 st.session_state.adding_subproject = False
 
+    # Storage backend for the whole project
+    storage_options = ["json", "store"]
+    settings = pm.get_settings(st.session_state.current_project)
+    storage = st.sidebar.radio(
+        "Storage backend",
+        storage_options,
+        index=storage_options.index(settings["storage"]),
+        format_func=lambda opt: {"json": "One JSON file per video",
+                                 "store": "Compressed shard store"}[opt],
+        key="storage_sel"
+    )
+    if storage != settings["storage"]:
+        pm.update_settings(st.session_state.current_project, storage=storage)
+    keep_segments = st.sidebar.checkbox(
+        "Keep timed segments (.seg)",
+        value=settings["keep_segments"],
+        help="Store start/duration per caption line in a compact columnar file for time-aligned search and clipping.",
+        key="keep_segments_sel"
+    )
+    if keep_segments != settings["keep_segments"]:
+        pm.update_settings(st.session_state.current_project, keep_segments=keep_segments)
+    languages = st.sidebar.text_input(
+        "Language preference",
+        value=", ".join(settings["languages"]),
+        help="Comma-separated language codes tried in order; 'auto' takes any language the video has.",
+        key="languages_sel"
+    )
+    languages = language_chain(languages) or DEFAULT_SETTINGS["languages"]
+    if languages != settings["languages"]:
+        pm.update_settings(st.session_state.current_project, languages=languages)
+    all_languages = st.sidebar.checkbox(
+        "Save every available language",
+        value=settings["all_languages"],
+        help="Save each language of the preference list the video has (as <video_id>.<lang>.json), not just the first.",
+        key="all_languages_sel"
+    )
+    if all_languages != settings["all_languages"]:
+        pm.update_settings(st.session_state.current_project, all_languages=all_languages)
+
 st.sidebar.markdown("---")
 st.sidebar.write("Current:")
 st.sidebar.write(f"Project: {st.session_state.current_project or 'None'}")
@@ -148,49 +240,123 @@ os.makedirs(base_dir, exist_ok=True)
 # ─── SCRAPER MODE ─────────────────────────────────────────────────────────
 if mode == "Scraper":
     st.title("YouTube Transcript Scraper")
-    input_url = st.text_input("Enter video or playlist URL/ID:")
+    input_text = st.text_area("Enter video or playlist URLs/IDs (one per line):")
+    workers = st.slider("Parallel workers", min_value=1, max_value=16, value=4)
+    with st.expander("Proxy pool (optional)"):
+        tor_ports_text = st.text_input("Tor SOCKS ports (comma separated, control port = SOCKS port + 1)",
+                                       placeholder="9050, 9052, 9054")
+        proxy_text = st.text_area("Other proxy URLs (one per line)",
+                                  placeholder="socks5h://10.0.0.2:1080")
+    tor_ports = [int(p) for p in re.findall(r"\d+", tor_ports_text)]
+    proxy_urls = [line.strip() for line in proxy_text.splitlines() if line.strip()]
+    # Pools are built by the job that first uses them, not while typing
+    proxy_pool = job_runner.proxy_pool(tor_ports, proxy_urls, create=False)
+    if proxy_pool is not None:
+        st.caption("Proxy health")
+        st.table(proxy_pool.stats())
     if st.button("Fetch Transcript"):
         if not st.session_state.current_project:
             st.error("Select or create a project first.")
         else:
             try:
-                # Playlist
-                if "playlist" in input_url and "list=" in input_url:
-                    pid = re.search(r"list=([A-Za-z0-9_-]+)", input_url).group(1)
-                    st.write(f"🔗 Playlist: {pid}")
-                    pl = Playlist(input_url)
-                    pl_dir = os.path.join(base_dir, pid)
-                    os.makedirs(pl_dir, exist_ok=True)
-                    for url in pl.video_urls:
-                        vid = get_video_id(url)
-                        segs = fetch_transcript(vid)
-                        if not segs:
-                            st.warning(f"No transcript for {vid}")
-                            continue
-                        data = format_output(segs, vid)
-                        save_output(data, vid, pl_dir)
-                        st.success(f"Saved {vid}.json → {pl_dir}")
-                # Single video
-                else:
-                    vid = get_video_id(input_url)
-                    segs = fetch_transcript(vid)
-                    if not segs:
-                        st.warning("No transcript found.")
-                    else:
-                        data = format_output(segs, vid)
-                        save_output(data, vid, base_dir)
-                        st.success(f"Saved {vid}.json → {base_dir}")
-            except Exception as e:
-                st.error(f"Error: {e}")
+                job_id = job_runner.submit(st.session_state.current_project, input_text.splitlines(),
+                                           st.session_state.current_subproject, workers=workers,
+                                           tor_ports=tor_ports, proxy_urls=proxy_urls)
+                st.success(f"Queued job {job_id} → {base_dir}")
+            except ValueError as e:
+                st.error(str(e))
+
+    # Jobs run on the app's background workers: the page can be left,
+    # reloaded or used for other submissions while they progress.
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def render_jobs() -> None:
+        jobs = job_queue.list(project=st.session_state.current_project, limit=20)
+        if not jobs:
+            st.caption("No jobs yet.")
+            return
+        if any(job["status"] == RUNNING for job in jobs):
+            render_throughput(st.empty())
+        st.subheader("Jobs")
+        for job in jobs:
+            target = "/".join(filter(None, (job["project"], job["subproject"])))
+            total = job["total"] if job["total"] is not None else f"{job['listed']}+"
+            status = "cancelling" if job["cancel_requested"] and job["status"] == RUNNING else job["status"]
+            counts = ", ".join(f"{n} {k}" for k, n in sorted(job["counts"].items()))
+            c1, c2 = st.columns([5, 1])
+            c1.progress(min(job["progress"], 1.0),
+                        text=f"`{job['id']}` · {target} · {status} · {job['done']}/{total}"
+                             + (f" · {counts}" if counts else ""))
+            if job["status"] in (QUEUED, RUNNING) and not job["cancel_requested"]:
+                if c2.button("Cancel", key=f"cancel_{job['id']}"):
+                    job_runner.cancel(job["id"])
+                    st.rerun(scope="fragment")
+            if job["error"]:
+                st.error(f"{job['id']}: {job['error']}")
+            with st.expander("Details"):
+                st.write(job["inputs"])
+                problems = [e for e in job_queue.events(job["id"], limit=5000)
+                            if e["event"] != "result" or e["status"] != DONE]
+                if problems:
+                    st.table(problems[-100:])
+
+    render_jobs()
 
 # ─── DASHBOARD MODE ───────────────────────────────────────────────────────
-else:
+elif mode == "Dashboard":
     st.title("Dashboard")
+    # Stats come straight from output/.stats.sqlite, which save_output keeps
+    # current; the tree is only walked to pick up outside changes, at most
+    # once per STATS_RESCAN_SECONDS or on "Rescan files".
+    if st.button("Rescan files"):
+        rescan_stats.clear()
+    changed = rescan_stats(OUTPUT_ROOT)
+    if changed:
+        st.caption(f"Re-indexed {changed} new or changed files")
+
     st.write("Project-level stats (files, tokens, bytes):")
-    proj_stats = get_project_level_stats(OUTPUT_ROOT)
+    proj_stats = get_project_level_stats(OUTPUT_ROOT, refresh=False)
     st.table([{"Project": p, "Files": f, "Tokens": t, "Bytes": b} for p, f, t, b in proj_stats])
 
     st.write("Subproject-level stats:")
-    sub_stats = get_subproject_level_stats(OUTPUT_ROOT)
+    sub_stats = get_subproject_level_stats(OUTPUT_ROOT, refresh=False)
     st.table([{"Project": p, "Subproject": s, "Files": f, "Tokens": t, "Bytes": b}
               for p, s, f, t, b in sub_stats])
+
+    st.write("Fetch pipeline (since the app started):")
+    render_throughput(st.empty())
+    stage_rows = metrics.stage_summary()
+    if stage_rows:
+        st.table(stage_rows)
+    if st.button("Export Prometheus metrics"):
+        prom_path = os.path.join(OUTPUT_ROOT, ".metrics.prom")
+        metrics.write_prometheus(prom_path)
+        st.success(f"Wrote {prom_path}")
+
+    st.write("Shared transcript files (output/.blobs):")
+    blob_stats = blob_store.stats()
+    st.table([{"Blobs": blob_stats["blobs"], "Bytes": blob_stats["bytes"], "Links": blob_stats["links"]}])
+    if st.button("Prune unused blobs"):
+        st.success(f"Removed {blob_store.prune()} blob(s) no transcript file uses any more")
+
+# ─── SEARCH MODE ──────────────────────────────────────────────────────────
+else:
+    st.title("Search Transcripts")
+    scope = base_dir if st.session_state.current_project else None
+    st.caption(f"Searching in: {scope or 'all projects'}")
+    if st.button("Rescan files"):
+        st.info(f"Indexed {search_index.refresh(scope)} new or changed transcripts")
+    query = st.text_input('Query (words, "exact phrase", AND / OR / NOT, prefix*)')
+    if query:
+        try:
+            results = search_index.search(query, scope, limit=50)
+        except Exception as e:
+            st.error(f"Invalid query: {e}")
+            results = []
+        st.write(f"{len(results)} result(s)")
+        for r in results:
+            url = r["url"] or f"https://www.youtube.com/watch?v={r['video_id']}"
+            st.markdown(f"**[{r['video_id']}]({url})** — `{r['path']}`")
+            st.write(r["snippet"])
+            if r["timestamps"]:
+                st.markdown(" · ".join(f"[{int(t) // 60}:{int(t) % 60:02d}]({url}&t={int(t)}s)"
+                                       for t in r["timestamps"]))
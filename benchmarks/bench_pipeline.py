@@ -0,0 +1,250 @@
+# benchmarks/bench_pipeline.py
+"""
+Offline benchmark of the fetch → format → save pipeline and the dashboard scanners.
+
+    python benchmarks/bench_pipeline.py --videos 500 --workers 16 --latency 0.08
+    python benchmarks/bench_pipeline.py --stages scan,stats --files 1000000 --tree /data/bench-tree
+
+Network stages run against benchmarks/mock_server.py on 127.0.0.1, so no
+traffic leaves the machine:
+  timedtext   fetch_timed_text (streamed XML fallback)
+  api         fetch_api_transcripts through youtube-transcript-api
+  format      format_output on the fetched segments
+  save        save_output, one JSON file per video
+  save_store  save_output into the compressed shard store
+Tree stages run on a synthetic output/ tree (built once, reused with --tree):
+  scan        scanner.scan_tree, cold walk of every file
+  stats       StatsIndex refresh (cold, then warm) + project/subproject stats
+  csv         TokenEstimator.generate_csv through the stats index
+
+Reports operations, throughput, p50/p99 latency per operation and peak
+traced memory per stage (tracemalloc adds overhead; --no-memory for the
+fastest timings).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockYouTubeServer, redirected_session  # noqa: E402
+from synthetic_tree import build_tree, video_id  # noqa: E402
+
+NETWORK_STAGES = ("timedtext", "api", "format", "save", "save_store")
+TREE_STAGES = ("scan", "stats", "csv")
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class StageRunner:
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.rows = []
+
+    def run(self, name: str, fn, items=None, workers: int = 1, unit: str = "ops") -> list:
+        """
+        Time fn(item) for every item (or fn() once), on `workers` threads.
+        Returns the results in input order and records a report row.
+        """
+        latencies = []
+
+        def timed(item):
+            start = time.perf_counter()
+            result = fn(item) if items is not None else fn()
+            latencies.append(time.perf_counter() - start)
+            return result
+
+        if self.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if items is None:
+            results = [timed(None)]
+        elif workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(timed, items))
+        else:
+            results = [timed(item) for item in items]
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.memory else 0
+        if self.memory:
+            tracemalloc.stop()
+
+        ops = len(results) if items is not None else 1
+        self.rows.append({
+            "stage": name,
+            "ops": ops,
+            "unit": unit,
+            "seconds": round(elapsed, 3),
+            "per_second": round(ops / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(statistics.median(latencies) * 1000, 2) if items is not None else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if items is not None else None,
+            "peak_mb": round(peak / 1e6, 1) if self.memory else None,
+        })
+        return results
+
+    def note(self, **fields) -> None:
+        self.rows[-1].update(fields)
+
+    def report(self) -> str:
+        lines = [f"{'stage':<12}{'ops':>9}{'seconds':>10}{'ops/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'peak MB':>9}  notes"]
+        for row in self.rows:
+            extra = {k: v for k, v in row.items()
+                     if k not in ("stage", "ops", "unit", "seconds", "per_second", "p50_ms", "p99_ms", "peak_mb")}
+            fmt = lambda v: "-" if v is None else v  # noqa: E731
+            lines.append(f"{row['stage']:<12}{row['ops']:>9}{row['seconds']:>10}{row['per_second']:>11}"
+                         f"{fmt(row['p50_ms']):>9}{fmt(row['p99_ms']):>9}{fmt(row['peak_mb']):>9}  "
+                         + " ".join(f"{k}={v}" for k, v in extra.items()))
+        return "\n".join(lines)
+
+
+def network_stages(runner: StageRunner, args, stages: set, workdir: str) -> None:
+    try:
+        import requests  # noqa: F401
+    except ImportError:
+        print("requests is not installed; skipping network stages", file=sys.stderr)
+        return
+    from core import transcript_scraper as ts
+
+    ids = [f"nocap{i:06d}" if args.no_caption_rate and i % round(1 / args.no_caption_rate) == 0
+           else video_id(i) for i in range(args.videos)]
+    with MockYouTubeServer(latency=args.latency, jitter=args.jitter, block_rate=args.block_rate,
+                           segments=args.segments) as server:
+        session = redirected_session(server.url, pool_maxsize=max(32, args.workers))
+        ts.TIMEDTEXT_URL = server.url + "/timedtext"
+        fetched = []
+
+        if "timedtext" in stages:
+            fetched = runner.run("timedtext", lambda vid: ts.fetch_timed_text(vid, "id", session),
+                                 ids, args.workers)
+            runner.note(empty=sum(1 for segs in fetched if not segs),
+                        mb_received=round(sum(len(s["text"]) for segs in fetched for s in segs) / 1e6, 2))
+
+        if "api" in stages:
+            try:
+                from youtube_transcript_api import YouTubeTranscriptApi
+            except ImportError:
+                print("youtube-transcript-api is not installed; skipping api stage", file=sys.stderr)
+            else:
+                api = YouTubeTranscriptApi(http_client=session)
+                results = runner.run("api", lambda vid: ts.fetch_api_transcripts(vid, ["id", "en"], api),
+                                     ids, args.workers)
+                statuses = {}
+                for _, status in results:
+                    statuses[status] = statuses.get(status, 0) + 1
+                runner.note(**statuses)
+                if not fetched:
+                    fetched = [res[0][1] if res else [] for res, _ in results]
+        if stages & {"timedtext", "api"}:
+            runner.note(mock_requests=sum(server.config.requests.values()),
+                        mock_429=server.config.requests.get("429", 0))
+
+    pairs = [(vid, segs) for vid, segs in zip(ids, fetched) if segs]
+    if not pairs:
+        return
+    formatted = []
+    if stages & {"format", "save", "save_store"}:
+        formatted = runner.run("format", lambda pair: (pair[0], pair[1], ts.format_output(pair[1], pair[0], "id")),
+                               pairs)
+    if "save" in stages:
+        out = os.path.join(workdir, "save-json")
+        runner.run("save", lambda item: ts.save_output(item[2], item[0], out, storage="json"),
+                   formatted, args.workers)
+    if "save_store" in stages:
+        out = os.path.join(workdir, "save-store")
+        runner.run("save_store", lambda item: ts.save_output(item[2], item[0], out, storage="store"),
+                   formatted, args.workers)
+
+
+def tree_stages(runner: StageRunner, args, stages: set, workdir: str) -> None:
+    from core.scanner import scan_tree
+    from core.stats_index import StatsIndex
+    from core.token_estimator import TokenEstimator
+
+    tree = args.tree or os.path.join(workdir, "tree")
+    start = time.perf_counter()
+    total = build_tree(tree, args.files)
+    print(f"Synthetic tree: {args.files} files, {total / 1e6:.1f} MB ({time.perf_counter() - start:.1f}s to build)",
+          file=sys.stderr)
+
+    if "scan" in stages:
+        runner.run("scan", lambda: sum(1 for _ in scan_tree(tree, args.scan_workers)), unit="tree")
+        runner.note(files_per_s=round(args.files / max(runner.rows[-1]["seconds"], 1e-9)))
+    if stages & {"stats", "csv"}:
+        index_path = os.path.join(tree, StatsIndex.FILENAME)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(index_path + suffix):
+                os.remove(index_path + suffix)
+        index = StatsIndex(tree)
+        if "stats" in stages:
+            runner.run("stats_cold", lambda: index.refresh(workers=args.scan_workers), unit="tree")
+            runner.note(files_per_s=round(args.files / max(runner.rows[-1]["seconds"], 1e-9)))
+            runner.run("stats_warm", lambda: index.refresh(workers=args.scan_workers), unit="tree")
+            runner.run("project", lambda: (index.project_stats(), index.subproject_stats()), unit="query")
+        else:
+            index.refresh(workers=args.scan_workers)
+        if "csv" in stages:
+            runner.run("csv", lambda: TokenEstimator(tree).generate_csv(workers=args.scan_workers), unit="tree")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default=",".join(NETWORK_STAGES + TREE_STAGES),
+                        help="Comma-separated subset of: " + ", ".join(NETWORK_STAGES + TREE_STAGES))
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fetch/save threads")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--block-rate", type=float, default=0.0, help="Share of mock responses that are 429")
+    parser.add_argument("--no-caption-rate", type=float, default=0.0, help="Share of videos without captions")
+    parser.add_argument("--segments", type=int, default=300, help="Caption lines per mock transcript")
+    parser.add_argument("--files", type=int, default=10_000, help="Files in the synthetic output tree")
+    parser.add_argument("--tree", help="Directory for the synthetic tree (kept, and reused when re-run)")
+    parser.add_argument("--scan-workers", type=int, default=None)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak memory tracking")
+    parser.add_argument("--json", help="Also write the report rows to this JSON file")
+    args = parser.parse_args(argv)
+
+    stages = {s.strip() for s in args.stages.split(",") if s.strip()}
+    unknown = stages - set(NETWORK_STAGES + TREE_STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    runner = StageRunner(memory=not args.no_memory)
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    try:
+        # Keep library status prints out of the report
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                if stages & set(NETWORK_STAGES):
+                    network_stages(runner, args, stages, workdir)
+                if stages & set(TREE_STAGES):
+                    tree_stages(runner, args, stages, workdir)
+            finally:
+                sys.stdout = stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(runner.report())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(runner.rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of importing the core modules.
+
+    python benchmarks/bench_startup.py [--runs 10]
+
+Each import runs in a fresh interpreter. Besides the wall time, the report
+shows which heavy third-party modules were pulled in and whether an HTTP
+client was created (it must not be: importing has to be side-effect free).
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    "core.transcript_scraper",
+    "core.fetch_engine",
+    "core.batch",
+    "core.dashboard",
+    "core.token_estimator",
+]
+HEAVY = ["requests", "pytube", "youtube_transcript_api", "xml.etree.ElementTree", "aiohttp", "streamlit"]
+
+PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+ts = sys.modules.get("core.transcript_scraper")
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+    "client_created": bool(ts is not None and ts.http_session is not None),
+}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    samples = []
+    last = None
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        last = json.loads(out.strip().splitlines()[-1])
+        samples.append(last["seconds"])
+    return {
+        "module": module,
+        "min_ms": round(min(samples) * 1000, 1),
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "heavy_imports": ",".join(last["heavy"]) or "-",
+        "client_created": last["client_created"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    rows = [measure(module, args.runs) for module in MODULES]
+    print(f"{'module':<26}{'min ms':>9}{'median ms':>11}  {'client':<7} heavy imports")
+    for row in rows:
+        print(f"{row['module']:<26}{row['min_ms']:>9}{row['median_ms']:>11}  "
+              f"{str(row['client_created']):<7} {row['heavy_imports']}")
+    # Non-zero exit if any import did network setup, so this can gate CI
+    return 1 if any(row["client_created"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# benchmarks/bench_timed_text.py
+"""
+Buffered vs streamed parsing of the timed-text fallback.
+
+    python benchmarks/bench_timed_text.py [--hours 1 4 12] [--runs 3]
+
+Builds synthetic timed-text XML for videos of the given lengths (one caption
+line every ~3 s) and turns each into a format_output() record three ways:
+  buffered - decode the whole body, ET.fromstring, list of segment dicts
+             (what fetch_timed_text did before streaming)
+  pipeline - iter_timed_text over 64 KiB chunks into a list of segments
+             (what fetch_timed_text does now: the pipeline keeps the
+             segments for the response cache and the segments sidecar)
+  streamed - iter_timed_text over 64 KiB chunks straight into format_output
+             (stream_timed_text consumers that only need the record)
+Reports the best wall time and the peak memory traced while processing.
+"""
+import os
+import sys
+import random
+import argparse
+import tracemalloc
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.transcript_scraper import TIMEDTEXT_CHUNK_BYTES, format_output, iter_timed_text  # noqa: E402
+
+WORDS = ("the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "dan", "yang",
+         "ini", "itu", "tidak", "ada", "&amp;", "&#39;s", "résumé", "naïve")
+
+
+def synthetic_xml(hours: float, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="utf-8" ?><transcript>']
+    t = 0.0
+    while t < hours * 3600:
+        dur = round(rng.uniform(1.5, 4.5), 2)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        parts.append(f'<text start="{t:.2f}" dur="{dur}">{text}\n</text>')
+        t += dur
+    parts.append("</transcript>")
+    return "".join(parts).encode("utf-8")
+
+
+def buffered(payload: bytes) -> dict:
+    import xml.etree.ElementTree as ET
+
+    root = ET.fromstring(payload.decode("utf-8"))
+    segments = [
+        {'text': (e.text or '').strip().replace("\n", " "),
+         'start': float(e.attrib.get('start', 0)), 'duration': float(e.attrib.get('dur', 0))}
+        for e in root.findall('text')
+    ]
+    return format_output(segments, "bench")
+
+
+def _chunks(payload: bytes):
+    return (payload[i:i + TIMEDTEXT_CHUNK_BYTES] for i in range(0, len(payload), TIMEDTEXT_CHUNK_BYTES))
+
+
+def pipeline(payload: bytes) -> dict:
+    segments = list(iter_timed_text(_chunks(payload)))
+    return format_output(segments, "bench")
+
+
+def streamed(payload: bytes) -> dict:
+    return format_output(iter_timed_text(_chunks(payload)), "bench")
+
+
+def measure(fn, payload: bytes, runs: int) -> tuple:
+    best = float("inf")
+    for _ in range(runs):
+        t = time.perf_counter()
+        result = fn(payload)
+        best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'hours':>6}{'xml MB':>9}  {'method':<9}{'best s':>8}{'peak MB':>9}")
+    for hours in args.hours:
+        payload = synthetic_xml(hours)
+        results = {}
+        for name, fn in (("buffered", buffered), ("pipeline", pipeline), ("streamed", streamed)):
+            best, peak, results[name] = measure(fn, payload, args.runs)
+            print(f"{hours:>6g}{len(payload) / 1e6:>9.1f}  {name:<9}{best:>8.3f}{peak / 1e6:>9.1f}")
+        for name in ("pipeline", "streamed"):
+            if results[name]["raw_content"] != results["buffered"]["raw_content"]:
+                print(f"{name} output differs from buffered output", file=sys.stderr)
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
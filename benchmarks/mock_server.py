@@ -0,0 +1,210 @@
+# benchmarks/mock_server.py
+"""
+Local stand-in for the YouTube endpoints the scraper talks to.
+
+    python benchmarks/mock_server.py --port 8765 --latency 0.08 --block-rate 0.05
+
+Serves deterministic synthetic transcripts (the same video ID always gets
+the same text) on:
+  GET  /timedtext?v=ID&lang=xx         timed-text XML (the fallback endpoint)
+  GET  /watch?v=ID                      watch page carrying an INNERTUBE_API_KEY
+  POST /youtubei/v1/player?key=...      player JSON with the caption track list
+  GET  /api/timedtext?v=ID&lang=xx      caption track XML (youtube-transcript-api)
+
+Video IDs starting with "nocap" have no captions; everything else has a
+manual "id" track and a generated "en" track. Latency, the share of
+requests answered with 429 and transcript sizes are configurable.
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+WORDS = ("the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "dan", "yang",
+         "ini", "itu", "tidak", "ada", "kita", "akan", "video", "terima", "kasih", "résumé")
+LANGUAGES = (("id", "Indonesian", ""), ("en", "English (auto-generated)", "asr"))
+NO_CAPTIONS_PREFIX = "nocap"
+
+
+def transcript_xml(video_id: str, language: str, segments: int, words: int) -> bytes:
+    """Deterministic timed-text XML for a video: `segments` lines of up to `words` words."""
+    rng = random.Random(hashlib.sha256(f"{video_id}:{language}".encode()).digest())
+    parts = ['<?xml version="1.0" encoding="utf-8" ?><transcript>']
+    t = 0.0
+    for _ in range(segments):
+        dur = round(rng.uniform(1.5, 4.5), 2)
+        text = escape(" ".join(rng.choice(WORDS) for _ in range(rng.randint(max(1, words // 3), words))))
+        parts.append(f'<text start="{t:.2f}" dur="{dur}">{text}</text>')
+        t += dur
+    parts.append("</transcript>")
+    return "".join(parts).encode("utf-8")
+
+
+class MockConfig:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, block_rate: float = 0.0,
+                 segments: int = 300, words: int = 10, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.block_rate = block_rate
+        self.segments = segments
+        self.words = words
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+
+    def count(self, kind: str) -> None:
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def blocked(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.block_rate
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockConfig
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> None:
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.command == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+        config = self.config
+        config.count(url.path)
+        time.sleep(config.delay())
+        if config.blocked():
+            config.count("429")
+            self._send(429, b"Too Many Requests", "text/plain")
+            return
+
+        if url.path in ("/timedtext", "/api/timedtext"):
+            vid, lang = query.get("v", ""), query.get("lang", "id")
+            if vid.startswith(NO_CAPTIONS_PREFIX) or lang not in dict((c, n) for c, n, _ in LANGUAGES):
+                self._send(200, b"", "text/xml")
+                return
+            self._send(200, transcript_xml(vid, lang, config.segments, config.words), "text/xml; charset=UTF-8")
+        elif url.path == "/watch":
+            html = '<html><script>var ytcfg = {"INNERTUBE_API_KEY": "mockkey"};</script></html>'
+            self._send(200, html.encode(), "text/html; charset=UTF-8")
+        elif url.path == "/youtubei/v1/player":
+            vid = json.loads(body or b"{}").get("videoId", "")
+            player = {"playabilityStatus": {"status": "OK"}}
+            if not vid.startswith(NO_CAPTIONS_PREFIX):
+                player["captions"] = {"playerCaptionsTracklistRenderer": {
+                    "captionTracks": [
+                        {"baseUrl": f"https://www.youtube.com/api/timedtext?v={vid}&lang={code}",
+                         "name": {"simpleText": name, "runs": [{"text": name}]}, "languageCode": code,
+                         "kind": kind, "isTranslatable": False}
+                        for code, name, kind in LANGUAGES
+                    ],
+                    "translationLanguages": []
+                }}
+            self._send(200, json.dumps(player).encode(), "application/json")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class MockYouTubeServer:
+    """
+    Threaded mock server on 127.0.0.1; use as a context manager. `url` is
+    the base URL (no trailing slash) and `config.requests` counts requests
+    per path.
+    """
+
+    def __init__(self, port: int = 0, **config):
+        self.config = MockConfig(**config)
+        handler = type("BoundMockHandler", (MockHandler,), {"config": self.config})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-youtube", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockYouTubeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockYouTubeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def redirected_session(base_url: str, pool_maxsize: int = 32):
+    """
+    requests.Session sending every youtube.com / google.com request to the
+    mock server instead, for youtube_transcript_api's hard-coded URLs.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    class RedirectAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+            return super().send(request, **kwargs)
+
+    session = requests.Session()
+    adapter = RedirectAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    for prefix in ("https://www.youtube.com", "http://www.youtube.com",
+                   "https://video.google.com", "http://video.google.com"):
+        session.mount(prefix, adapter)
+    return session
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--block-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--segments", type=int, default=300, help="Caption lines per transcript")
+    parser.add_argument("--words", type=int, default=10, help="Max words per caption line")
+    args = parser.parse_args(argv)
+    server = MockYouTubeServer(args.port, latency=args.latency, jitter=args.jitter,
+                               block_rate=args.block_rate, segments=args.segments, words=args.words)
+    print(f"Serving on {server.url} (Ctrl+C to stop); point TRANSCRIPT_TIMEDTEXT_URL at {server.url}/timedtext")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
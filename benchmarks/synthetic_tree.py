@@ -0,0 +1,82 @@
+# benchmarks/synthetic_tree.py
+"""
+Build a synthetic output/ tree for the dashboard and scanner benchmarks.
+
+    python benchmarks/synthetic_tree.py /tmp/bench-output --files 100000
+
+Files are spread over projects/subprojects/playlists the way the app lays
+them out, in the "header" JSON layout (or "legacy" with --layout legacy).
+Content is deterministic for a given --seed.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "dan", "yang",
+         "ini", "itu", "tidak", "ada", "kita", "akan", "video", "terima", "kasih")
+
+
+def video_id(i: int) -> str:
+    return f"v{i:010d}"
+
+
+def build_tree(root: str, files: int, projects: int = 10, subprojects: int = 5,
+               playlist_size: int = 200, words: int = 400, layout: str = "header",
+               seed: int = 0) -> int:
+    """
+    Write `files` transcript JSONs under `root` (existing files are kept, so
+    re-running with the same arguments is cheap). Returns the total bytes.
+    """
+    rng = random.Random(seed)
+    # A few hundred distinct bodies, reused round-robin: content generation
+    # would otherwise dominate building a 1M-file tree
+    bodies = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(words // 2, words)))
+              for _ in range(256)]
+    total = 0
+    for i in range(files):
+        project = f"project{i % projects:02d}"
+        sub = f"sub{(i // projects) % subprojects:02d}"
+        playlist = f"PL{i // playlist_size:06d}"
+        directory = os.path.join(root, project, sub, playlist)
+        path = os.path.join(directory, f"{video_id(i)}.json")
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+            continue
+        os.makedirs(directory, exist_ok=True)
+        raw = bodies[i % len(bodies)]
+        meta = {
+            "token_count": len(raw) // 4,
+            "url": f"https://www.youtube.com/watch?v={video_id(i)}",
+            "bytes": len(raw.encode("utf-8")),
+            "language": "id",
+            "fetched_at": "2025-01-01T00:00:00+00:00"
+        }
+        data = {"raw_content": raw, **meta} if layout == "legacy" else {**meta, "raw_content": raw}
+        payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(payload)
+        total += len(payload)
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--subprojects", type=int, default=5)
+    parser.add_argument("--layout", choices=("header", "legacy"), default="header")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    total = build_tree(args.root, args.files, args.projects, args.subprojects,
+                       layout=args.layout, seed=args.seed)
+    print(f"{args.files} files, {total / 1e6:.1f} MB under {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
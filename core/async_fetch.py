@@ -0,0 +1,344 @@
+# core/async_fetch.py
+"""
+Fully async transcript fetching on aiohttp, for embedding in asyncio services.
+
+Follows the same steps as youtube_transcript_api (watch page → innertube
+player → caption track XML), so no thread is tied up per fetch, and shares
+the synchronous pipeline's behaviour: the language preference chain
+(resolve_transcripts), the timed-text fallback, the response cache and the
+proxy pool (health-based endpoint choice, Tor circuit rotation on blocks).
+"""
+import os
+import re
+import json
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Optional, Sequence, Union
+from xml.parsers.expat import ExpatError
+import xml.etree.ElementTree as ET
+
+import aiohttp
+
+from core import transcript_scraper
+from core.manifest import FAILED
+from core.metrics import get_metrics
+from core.transcript_scraper import (
+    AUTO_LANGUAGE, TIMEDTEXT_CHUNK_BYTES, TimedTextParser, cached_transcripts,
+    language_chain, resolve_transcripts
+)
+
+if TYPE_CHECKING:
+    from core.proxy_pool import ProxyEndpoint, ProxyPool
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10)
+# Base URL of the watch page / innertube API / caption tracks; overridable
+# like TIMEDTEXT_URL, e.g. to point at benchmarks/mock_server.py
+YOUTUBE_URL = os.environ.get("TRANSCRIPT_YOUTUBE_URL", "https://www.youtube.com")
+# Client the player request identifies as (as youtube_transcript_api does)
+INNERTUBE_CONTEXT = {"client": {"clientName": "ANDROID", "clientVersion": "20.10.38"}}
+API_KEY_RE = re.compile(r'"INNERTUBE_API_KEY":\s*"([a-zA-Z0-9_-]+)"')
+CONSENT_RE = re.compile(r'name="v" value="(.*?)"')
+
+
+# Errors that fail a single fetch rather than the whole run
+FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError)
+try:
+    from aiohttp_socks import ProxyConnectionError, ProxyError, ProxyTimeoutError
+    FETCH_ERRORS += (ProxyConnectionError, ProxyError, ProxyTimeoutError)
+except ImportError:
+    pass
+
+
+class BlockedError(Exception):
+    """YouTube answered with a rate limit, captcha or bot check."""
+
+
+class CaptionTrack:
+    """Caption track from the player response, shaped like the API's Transcript for resolve_transcripts."""
+
+    def __init__(self, track: dict):
+        self.language_code = track["languageCode"]
+        self.is_generated = track.get("kind") == "asr"
+        self.base_url = track["baseUrl"].replace("&fmt=srv3", "")
+
+
+def _youtube_url(url: str) -> str:
+    """Point absolute youtube.com URLs (caption tracks) at YOUTUBE_URL."""
+    for prefix in ("https://www.youtube.com", "http://www.youtube.com"):
+        if url.startswith(prefix):
+            return YOUTUBE_URL + url[len(prefix):]
+    return url
+
+
+def _check_blocked(resp: aiohttp.ClientResponse) -> None:
+    if resp.status == 429:
+        raise BlockedError(f"HTTP 429 from {resp.url.path}")
+
+
+async def _read_segments(resp: aiohttp.ClientResponse, source: str) -> list:
+    """Parse a timed-text XML response as it downloads; [] for an empty body."""
+    parser, segments, seen_data = TimedTextParser(), [], False
+    metrics = get_metrics()
+    async for chunk in resp.content.iter_chunked(TIMEDTEXT_CHUNK_BYTES):
+        metrics.inc("timedtext_response_bytes_total", len(chunk))
+        seen_data = seen_data or bool(chunk.strip())
+        if seen_data:
+            segments.extend(parser.feed(chunk))
+    if not seen_data:
+        return []
+    segments += parser.close()
+    metrics.inc("transcript_text_bytes_total", sum(len(seg["text"].encode("utf-8")) for seg in segments),
+                source=source)
+    return segments
+
+
+async def _list_tracks(session: aiohttp.ClientSession, video_id: str,
+                       proxy: Optional[str]) -> Optional[list]:
+    """Caption tracks of a video, or None if it has captions disabled."""
+    watch_url = f"{YOUTUBE_URL}/watch"
+    async with session.get(watch_url, params={"v": video_id}, proxy=proxy, timeout=DEFAULT_TIMEOUT) as resp:
+        _check_blocked(resp)
+        html = await resp.text()
+    if 'action="https://consent.youtube.com/s"' in html:
+        # EU consent interstitial: accept it once for this session, as the API does
+        match = CONSENT_RE.search(html)
+        if match:
+            session.cookie_jar.update_cookies({"CONSENT": "YES+" + match.group(1)})
+            async with session.get(watch_url, params={"v": video_id}, proxy=proxy,
+                                   timeout=DEFAULT_TIMEOUT) as resp:
+                _check_blocked(resp)
+                html = await resp.text()
+    match = API_KEY_RE.search(html)
+    if match is None:
+        if 'class="g-recaptcha"' in html:
+            raise BlockedError("captcha on the watch page")
+        raise ValueError(f"No innertube API key on the watch page of {video_id}")
+
+    async with session.post(f"{YOUTUBE_URL}/youtubei/v1/player", params={"key": match.group(1)},
+                            json={"context": INNERTUBE_CONTEXT, "videoId": video_id},
+                            proxy=proxy, timeout=DEFAULT_TIMEOUT) as resp:
+        _check_blocked(resp)
+        player = json.loads(await resp.text())
+    playability = player.get("playabilityStatus", {})
+    if playability.get("status") != "OK":
+        reason = playability.get("reason") or playability.get("status", "")
+        if "bot" in reason.lower():
+            raise BlockedError(reason)
+        print(f"Video {video_id} is not playable: {reason}")
+        return []
+    renderer = player.get("captions", {}).get("playerCaptionsTracklistRenderer")
+    if not renderer or "captionTracks" not in renderer:
+        return None
+    return [CaptionTrack(track) for track in renderer["captionTracks"]]
+
+
+async def _fetch_api_transcripts(session: aiohttp.ClientSession, video_id: str, chain: list,
+                                 all_languages: bool, proxy: Optional[str]) -> tuple[list, str]:
+    try:
+        tracks = await _list_tracks(session, video_id, proxy)
+        if tracks is None:
+            print(f"Transcripts are disabled for video {video_id}")
+            return [], "disabled"
+        chosen = resolve_transcripts(tracks, chain, all_languages)
+        if not chosen:
+            print(f"No transcript found for video {video_id} in {chain}")
+            return [], "no-transcript"
+        results = []
+        for track in chosen:
+            async with session.get(_youtube_url(track.base_url), proxy=proxy, timeout=DEFAULT_TIMEOUT) as resp:
+                _check_blocked(resp)
+                segments = await _read_segments(resp, "api")
+            if segments:
+                results.append((track.language_code, segments))
+        return results, "ok" if results else "no-transcript"
+    except BlockedError as e:
+        print(f"RequestBlocked for {video_id}: {e}")
+        return [], "blocked"
+    except (ExpatError, ET.ParseError) as e:
+        print(f"XML parse error ({type(e).__name__}), falling back to timed-text…")
+        return [], "fallback"
+
+
+async def fetch_timed_text_async(session: aiohttp.ClientSession, video_id: str,
+                                 language: str = "id", proxy: Optional[str] = None) -> list:
+    """
+    Async version of fetch_timed_text on an aiohttp session. `proxy` takes an
+    HTTP proxy URL; SOCKS/Tor proxies need a session with an aiohttp_socks
+    connector (see fetch_many).
+    """
+    with get_metrics().span("fallback", video_id=video_id, language=language) as span:
+        try:
+            async with session.get(transcript_scraper.TIMEDTEXT_URL, params={"lang": language, "v": video_id},
+                                   proxy=proxy, timeout=DEFAULT_TIMEOUT) as resp:
+                segments = await _read_segments(resp, "timedtext") if resp.status < 400 else []
+        except (aiohttp.ClientError, asyncio.TimeoutError, ExpatError, ET.ParseError) as e:
+            print(f"Timed-text fetch failed: {e}")
+            span["outcome"] = "error"
+            return []
+        span["outcome"] = "ok" if segments else "no-transcript"
+        return segments
+
+
+async def fetch_transcripts_async(video_id: str, languages: Union[str, Sequence[str]] = "id",
+                                  session: Optional[aiohttp.ClientSession] = None,
+                                  proxy: Optional[str] = None,
+                                  all_languages: bool = False) -> tuple[list, str, Optional[str]]:
+    """
+    Async counterpart of transcript_scraper.fetch_transcripts: returns
+    (results, status, fetched_at) with results as [(language, segments), ...].
+    Served from the response cache when possible; fresh results are stored
+    in it. Request errors propagate.
+    """
+    chain = language_chain(languages)
+    # Local SQLite lookups: fast enough to run on the event loop
+    hit = cached_transcripts(video_id, chain, all_languages)
+    if hit is not None:
+        return hit
+    cache = transcript_scraper.response_cache
+    metrics = get_metrics()
+    if cache is not None:
+        metrics.inc("response_cache_requests_total", result="miss")
+
+    if session is None:
+        async with aiohttp.ClientSession() as own_session:
+            return await fetch_transcripts_async(video_id, chain, own_session, proxy, all_languages)
+
+    with metrics.span("fetch", video_id=video_id) as span:
+        results, status = await _fetch_api_transcripts(session, video_id, chain, all_languages, proxy)
+        span["outcome"] = status
+    if status == "fallback":
+        results = []
+        for code in chain:
+            if code == AUTO_LANGUAGE:
+                continue
+            segments = await fetch_timed_text_async(session, video_id, code, proxy)
+            if segments:
+                results.append((code, segments))
+                if not all_languages:
+                    break
+        status = "ok" if results else "no-transcript"
+    if status != "ok":
+        return results, status, None
+    fetched_ts = cache.put(video_id, chain, results, all_languages) if cache is not None else time.time()
+    return results, status, datetime.fromtimestamp(fetched_ts, timezone.utc).isoformat(timespec="seconds")
+
+
+async def fetch_transcript_async(video_id: str, language: str = "id",
+                                 session: Optional[aiohttp.ClientSession] = None,
+                                 proxy: Optional[str] = None) -> tuple[list, str]:
+    """Single-language form of fetch_transcripts_async; returns (segments, status)."""
+    results, status, _ = await fetch_transcripts_async(video_id, [language], session, proxy)
+    return (results[0][1] if results else []), status
+
+
+class _ProxySessions:
+    """One aiohttp session per proxy endpoint (SOCKS needs its own connector)."""
+
+    def __init__(self, limit: int, cookies: Optional[dict]):
+        self.limit = limit
+        self.cookies = cookies
+        self.sessions = {}
+
+    def get(self, endpoint: "ProxyEndpoint") -> tuple[aiohttp.ClientSession, Optional[str]]:
+        """(session, proxy argument for requests) for `endpoint`."""
+        socks = endpoint.url.startswith("socks")
+        if endpoint.url not in self.sessions:
+            if socks:
+                try:
+                    from aiohttp_socks import ProxyConnector
+                except ImportError:
+                    raise RuntimeError("SOCKS/Tor proxies with fetch_many need the aiohttp-socks package")
+                # aiohttp_socks resolves names through the proxy for socks5h-style URLs itself
+                connector = ProxyConnector.from_url(endpoint.url.replace("socks5h://", "socks5://"), rdns=True,
+                                                    limit=self.limit)
+            else:
+                connector = aiohttp.TCPConnector(limit=self.limit)
+            self.sessions[endpoint.url] = aiohttp.ClientSession(connector=connector, cookies=self.cookies)
+        return self.sessions[endpoint.url], None if socks else endpoint.url
+
+    async def close(self) -> None:
+        for session in self.sessions.values():
+            await session.close()
+
+
+async def fetch_many(video_ids: Iterable[str], concurrency: int = 100,
+                     languages: Union[str, Sequence[str]] = "id",
+                     session: Optional[aiohttp.ClientSession] = None,
+                     proxy: Optional[str] = None,
+                     proxy_pool: Optional["ProxyPool"] = None,
+                     all_languages: bool = False) -> AsyncIterator[tuple[str, list, str]]:
+    """
+    Fetch many transcripts with at most `concurrency` in flight, yielding
+    (video_id, results, status) as each one completes, where results is
+    [(language, segments), ...] and status as for fetch_transcripts, or
+    "failed" if a request errored.
+
+    With a `proxy_pool`, every fetch goes through the healthiest endpoint
+    (see core.proxy_pool) and reports its latency and outcome back to the
+    pool; otherwise `session`/`proxy` are used for all of them.
+
+    Inputs are consumed lazily. Closing the generator early (break, aclose()
+    or cancelling the consuming task) cancels every fetch still in flight.
+    """
+    # Reuse the browser cookies loaded into the shared requests session
+    shared = transcript_scraper.http_session
+    cookies = {c.name: c.value for c in shared.cookies} if shared is not None else None
+    own_session = session is None and proxy_pool is None
+    if own_session:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency), cookies=cookies)
+    proxy_sessions = _ProxySessions(concurrency, cookies) if proxy_pool is not None else None
+
+    async def fetch(vid: str, client: aiohttp.ClientSession, via: Optional[str]) -> tuple[str, list, str]:
+        try:
+            results, status, _ = await fetch_transcripts_async(vid, languages, client, via, all_languages)
+        except FETCH_ERRORS as e:
+            print(f"Fetch failed for {vid}: {e}")
+            return vid, [], FAILED
+        return vid, results, status
+
+    async def one(vid: str) -> tuple[str, list, str]:
+        if proxy_pool is None:
+            return await fetch(vid, session, proxy)
+        endpoint = proxy_pool.acquire()
+        start = time.monotonic()
+        try:
+            client, via = proxy_sessions.get(endpoint)
+            result = await fetch(vid, client, via)
+        except BaseException:
+            proxy_pool.release(endpoint, time.monotonic() - start, "error")
+            raise
+        outcome = {"blocked": "blocked", FAILED: "error"}.get(result[2], "ok")
+        if outcome == "blocked":
+            # A block rotates Tor circuits over the control port (blocking
+            # socket I/O): keep it off the event loop
+            await asyncio.to_thread(proxy_pool.release, endpoint, time.monotonic() - start, outcome)
+        else:
+            proxy_pool.release(endpoint, time.monotonic() - start, outcome)
+        return result
+
+    in_flight = set()
+    ids = iter(video_ids)
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < concurrency:
+                vid = next(ids, None)
+                if vid is None:
+                    exhausted = True
+                    break
+                in_flight.add(asyncio.ensure_future(one(vid)))
+            if not in_flight:
+                break
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if own_session:
+            await session.close()
+        if proxy_sessions is not None:
+            await proxy_sessions.close()
@@ -0,0 +1,203 @@
+# core/batch.py
+"""
+Headless batch ingestion.
+
+    python -m core.batch urls.txt --project MyProject --subproject Nightly
+    cat urls.txt | python -m core.batch - --project MyProject --workers 8
+
+Reads video/playlist URLs (or IDs), one per line, from files or stdin,
+deduplicates video IDs across all inputs, fetches them through the
+parallel engine and prints one JSON object per line on stdout. Library
+log output goes to stderr. Exits with 1 if any video failed or was blocked.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+import contextlib
+from datetime import timedelta
+from typing import Iterable, Iterator, TextIO
+
+from core.fetch_engine import run_jobs
+from core.manifest import PlaylistManifest, FAILED, BLOCKED
+from core.metrics import JsonLogExporter, PrometheusFileExporter, get_metrics
+from core.playlist_cache import DEFAULT_TTL, PlaylistCache, prefetch
+from core.blob_store import BlobStore
+from core.project_manager import ProjectManager
+from core.response_cache import DEFAULT_TTL as RESPONSE_TTL, ResponseCache
+from core.scheduler import RequestScheduler
+from core.stats_index import StatsIndex
+from core.transcript_scraper import create_http_client, get_playlist_id, get_video_id, set_response_cache
+
+
+def read_inputs(sources: Iterable[str]) -> Iterator[str]:
+    """Yield non-empty, non-comment lines from the given files ('-' is stdin)."""
+    for source in sources:
+        handle = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+        try:
+            for line in handle:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+
+def expand_jobs(lines: Iterable[str], base_dir: str, max_attempts: int,
+                emit, stats: dict, playlist_ttl: timedelta = DEFAULT_TTL) -> Iterator[tuple]:
+    """
+    Turn input lines into (video_id, output_dir, manifest) jobs. Playlists
+    are enumerated lazily, through their PlaylistCache, into
+    base_dir/<playlist_id>; single videos go to base_dir. Each video ID is
+    scheduled at most once across all inputs, and videos already done (per
+    the directory's manifest) are skipped.
+    """
+    seen = set()
+    manifests = {}
+
+    def manifest_for(directory: str, playlist_id: str | None = None) -> PlaylistManifest:
+        if directory not in manifests:
+            manifests[directory] = PlaylistManifest(directory, playlist_id)
+        return manifests[directory]
+
+    def job(vid: str, directory: str, manifest: PlaylistManifest):
+        if vid in seen:
+            stats["duplicates"] += 1
+            return None
+        seen.add(vid)
+        if not manifest.needs_fetch(vid, max_attempts):
+            stats["skipped"] += 1
+            return None
+        return vid, directory, manifest
+
+    try:
+        for line in lines:
+            playlist_id = get_playlist_id(line)
+            if playlist_id:
+                directory = os.path.join(base_dir, playlist_id)
+                manifest = manifest_for(directory, playlist_id)
+                emit({"event": "playlist", "playlist_id": playlist_id})
+                cache = PlaylistCache(directory, playlist_id, playlist_ttl)
+                try:
+                    for vid in cache.iter_video_ids(line.split("&si=")[0]):
+                        item = job(vid, directory, manifest)
+                        if item:
+                            yield item
+                except Exception as e:
+                    emit({"event": "playlist_error", "playlist_id": playlist_id, "error": str(e)})
+                continue
+
+            try:
+                vid = get_video_id(line)
+            except ValueError as e:
+                emit({"event": "invalid", "input": line, "error": str(e)})
+                continue
+            item = job(vid, base_dir, manifest_for(base_dir))
+            if item:
+                yield item
+    finally:
+        # Persist legacy outputs adopted by needs_fetch
+        for manifest in manifests.values():
+            manifest.flush()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m core.batch", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="Files with one URL/ID per line ('-' or nothing reads stdin)")
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--subproject")
+    parser.add_argument("--output-root", default="output")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--language",
+                        help="Language code or comma-separated preference chain, e.g. id,en,auto "
+                             "(default: the project's setting)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max requests per second")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--playlist-ttl", type=float, default=DEFAULT_TTL.total_seconds() / 3600,
+                        help="Hours a cached playlist listing is reused before re-enumerating (0 = always)")
+    parser.add_argument("--cache-ttl", type=float, default=RESPONSE_TTL / 3600,
+                        help="Hours fetched transcripts are served from the response cache (0 = don't cache)")
+    parser.add_argument("--direct", action="store_true", help="Don't route through Tor")
+    parser.add_argument("--cookies", default="cookies.txt")
+    parser.add_argument("--tor-ports", default="",
+                        help="Comma-separated SOCKS ports of extra Tor instances to spread load over")
+    parser.add_argument("--proxy", action="append", default=[], help="Proxy URL for the pool (repeatable)")
+    parser.add_argument("--metrics-file",
+                        help="Write Prometheus text-format metrics here (every 15 s and at exit)")
+    parser.add_argument("--trace-log", help="Append one JSON line per timed pipeline stage to this file")
+    return parser
+
+
+def run(args, out: TextIO) -> int:
+    # Playlist enumeration emits from the prefetch thread
+    emit_lock = threading.Lock()
+
+    def emit(event: dict) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with emit_lock:
+            out.write(line)
+            out.flush()
+
+    pm = ProjectManager(args.output_root)
+    StatsIndex(args.output_root)
+    BlobStore(args.output_root)
+    if args.cache_ttl > 0:
+        set_response_cache(ResponseCache(args.output_root, ttl=args.cache_ttl * 3600))
+    if args.project not in pm.get_projects():
+        pm.create_project(args.project)
+    base_dir = os.path.join(args.output_root, args.project)
+    if args.subproject:
+        if args.subproject not in pm.get_subprojects(args.project):
+            pm.create_subproject(args.project, args.subproject)
+        base_dir = os.path.join(base_dir, args.subproject)
+
+    _, status = create_http_client(cookie_file=args.cookies, use_tor=not args.direct,
+                                   pool_maxsize=max(32, args.workers))
+    emit({"event": "connection", **status})
+
+    from core.proxy_pool import ProxyPool
+    tor_ports = [int(p) for p in re.findall(r"\d+", args.tor_ports)]
+    proxy_pool = ProxyPool.from_config(tor_ports, args.proxy, cookie_file=args.cookies)
+
+    metrics = get_metrics()
+    exporter = PrometheusFileExporter(metrics, args.metrics_file).start() if args.metrics_file else None
+    trace_log = JsonLogExporter(args.trace_log) if args.trace_log else None
+    if trace_log is not None:
+        metrics.add_listener(trace_log)
+
+    stats = {"duplicates": 0, "skipped": 0}
+    counts = {}
+    # Enumerate inputs/playlists on a background thread, ahead of the fetchers
+    jobs = prefetch(expand_jobs(read_inputs(args.inputs), base_dir, args.max_attempts, emit, stats,
+                                timedelta(hours=args.playlist_ttl)))
+    try:
+        for done, result in enumerate(run_jobs(jobs, max_workers=args.workers, language=args.language,
+                                               scheduler=RequestScheduler(rate=args.rate),
+                                               proxy_pool=proxy_pool), start=1):
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            emit({"event": "result", "done": done, **result})
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if trace_log is not None:
+            metrics.remove_listener(trace_log)
+            trace_log.close()
+
+    emit({"event": "summary", **counts, **stats, "stages": metrics.stage_summary()})
+    return 1 if counts.get(FAILED) or counts.get(BLOCKED) else 0
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Keep stdout machine-readable: library print() output goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        return run(args, out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# core/blob_store.py
+import os
+import hashlib
+import secrets
+from typing import Optional
+
+from core.fileio import clear_find_cache, find_upwards, shared_instance, write_bytes_atomic
+
+
+class BlobStore:
+    """
+    Content-addressed storage under `<output_root>/.blobs/`: every distinct
+    payload is written once as `<sha256[:2]>/<sha256>` and output files are
+    hard links to it, so the same transcript saved in several playlist
+    directories takes the disk space of one. Callers can address a payload
+    by a `key` other than its bytes (e.g. leaving out a fetch timestamp);
+    the first payload stored under a key is the one every link shares.
+    Files are only ever replaced (never modified in place), so a rewrite of
+    one link leaves the others untouched.
+    """
+
+    DIRNAME = ".blobs"
+
+    def __init__(self, output_root: str):
+        self.output_root = output_root
+        self.root = os.path.join(output_root, self.DIRNAME)
+        os.makedirs(self.root, exist_ok=True)
+        clear_find_cache()
+
+    @classmethod
+    def for_path(cls, path: str) -> Optional["BlobStore"]:
+        """Return the blob store of the nearest ancestor of `path` that has one, if any."""
+        root = find_upwards(os.path.dirname(os.path.abspath(path)), cls.DIRNAME)
+        return shared_instance(cls, root) if root is not None else None
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, payload: bytes, key: Optional[bytes] = None) -> str:
+        """Store `payload` (once per `key`, default the payload itself) and return its blob path."""
+        path = self.blob_path(hashlib.sha256(payload if key is None else key).hexdigest())
+        if not os.path.exists(path):
+            write_bytes_atomic(path, payload)
+        return path
+
+    def write(self, path: str, payload: bytes, key: Optional[bytes] = None) -> bool:
+        """
+        Atomically make `path` a hard link to the blob holding `payload`
+        (see put for `key`). Falls back to a plain atomic write where hard
+        links are not supported; returns whether the file was deduplicated.
+        """
+        blob = self.put(payload, key)
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".tmp-{secrets.token_hex(8)}.part")
+        try:
+            os.link(blob, tmp_path)
+            os.replace(tmp_path, path)
+            return True
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            write_bytes_atomic(path, payload)
+            return False
+
+    def prune(self) -> int:
+        """Delete blobs no output file links to any more; returns how many."""
+        removed = 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and entry.stat().st_nlink <= 1:
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        blobs, size, links = 0, 0, 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                st = entry.stat()
+                blobs += 1
+                size += st.st_size
+                links += st.st_nlink - 1
+        return {"blobs": blobs, "bytes": size, "links": links}
@@ -1,78 +1,31 @@
 # core/dashboard.py
-import os
-import json
+from core.stats_index import StatsIndex
 
-def get_project_level_stats(output_root: str):
+def get_project_level_stats(output_root: str, refresh: bool = True, workers: int | None = None):
     """
     For each project under output_root, compute:
       - total number of transcript JSON files
       - sum of all token_count fields
       - total size in bytes of all JSON files
     Returns a list of [project, total_files, total_tokens, total_bytes].
-    """
-    stats = []
-    for project in sorted(os.listdir(output_root)):
-        proj_path = os.path.join(output_root, project)
-        if not os.path.isdir(proj_path):
-            continue
-
-        total_files = 0
-        total_tokens = 0
-        total_bytes = 0
 
-        # Walk through subdirectories
-        for root, _, files in os.walk(proj_path):
-            for fn in files:
-                if fn.endswith(".json"):
-                    total_files += 1
-                    full = os.path.join(root, fn)
-                    total_bytes += os.path.getsize(full)
-                    try:
-                        with open(full, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                            total_tokens += int(data.get("token_count", 0))
-                    except Exception:
-                        # skip malformed JSON
-                        pass
-
-        stats.append([project, total_files, total_tokens, total_bytes])
-    return stats
+    Served from the persistent StatsIndex; with refresh=True the index is
+    first synced with the files on disk in a single pass (only changed
+    files are re-read, over `workers` processes if given).
+    """
+    index = StatsIndex(output_root)
+    if refresh:
+        index.refresh(workers=workers)
+    return index.project_stats()
 
 
-def get_subproject_level_stats(output_root: str):
+def get_subproject_level_stats(output_root: str, refresh: bool = True, workers: int | None = None):
     """
     For each subproject under each project, compute the same metrics:
       - project name, subproject name, total_files, total_tokens, total_bytes
     Returns a list of [project, subproject, total_files, total_tokens, total_bytes].
     """
-    stats = []
-    for project in sorted(os.listdir(output_root)):
-        proj_path = os.path.join(output_root, project)
-        if not os.path.isdir(proj_path):
-            continue
-
-        # Each immediate subfolder is a subproject
-        for sub in sorted(os.listdir(proj_path)):
-            sub_path = os.path.join(proj_path, sub)
-            if not os.path.isdir(sub_path):
-                continue
-
-            total_files = 0
-            total_tokens = 0
-            total_bytes = 0
-
-            for root, _, files in os.walk(sub_path):
-                for fn in files:
-                    if fn.endswith(".json"):
-                        total_files += 1
-                        full = os.path.join(root, fn)
-                        total_bytes += os.path.getsize(full)
-                        try:
-                            with open(full, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                                total_tokens += int(data.get("token_count", 0))
-                        except Exception:
-                            pass
-
-            stats.append([project, sub, total_files, total_tokens, total_bytes])
-    return stats
+    index = StatsIndex(output_root)
+    if refresh:
+        index.refresh(workers=workers)
+    return index.subproject_stats()
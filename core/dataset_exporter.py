@@ -0,0 +1,525 @@
+# core/dataset_exporter.py
+"""
+Export transcripts as training-data shards.
+
+    python -m core.dataset_exporter output/MyProject --max-tokens 50000000 --languages id,en
+    python -m core.dataset_exporter output/MyProject/Nightly --out /data/nightly --no-dedup
+
+Streams every transcript under a project/subproject folder (JSON files and
+compressed stores alike) into gzip-compressed JSONL shards of bounded size
+and/or token count, one {"id", "text", "url", "language", "token_count",
+"source", "fetched_at"} object per line. Optionally keeps only transcripts
+whose detected language (langdetect) is in a list, and drops near-duplicates
+(re-uploads, mirrors) found with MinHash + LSH. Memory stays bounded by the
+shard size and a few batches of documents, plus ~1 KB of dedup state per
+exported transcript.
+"""
+import os
+import re
+import sys
+import json
+import gzip
+import shutil
+import hashlib
+import argparse
+import tempfile
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from core.fileio import write_bytes_atomic, write_json_atomic
+from core.scanner import iter_entries
+from core.token_estimator import count_tokens
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# Uncompressed JSONL bytes per shard
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+# Documents analysed (language + signature) per batch of process pool work
+BATCH_SIZE = 256
+# langdetect only looks at the start of each transcript
+DETECT_CHARS = 5000
+UNKNOWN_LANGUAGE = "unknown"
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+_EMPTY_BIN = 1 << 32
+
+
+def minhash_signature(text: str, num_perm: int = DEFAULT_NUM_PERM,
+                      shingle_size: int = DEFAULT_SHINGLE_SIZE) -> Optional[array]:
+    """
+    MinHash signature of the text's word `shingle_size`-grams, as `num_perm`
+    32-bit values, or None for a text without words.
+
+    Uses one-permutation hashing: each shingle is hashed once (blake2b, so
+    signatures agree across processes and runs) and the hash picks a bin
+    and a value; every bin keeps its minimum. Empty bins borrow from the
+    next non-empty one (rotation densification). The share of equal bins
+    between two signatures estimates the shingles' Jaccard similarity,
+    like classic MinHash, for one hash per shingle instead of `num_perm`.
+    """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + shingle_size])
+                for i in range(max(1, len(words) - shingle_size + 1))}
+    bins = [_EMPTY_BIN] * num_perm
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        slot = (h & 0xFFFFFFFF) % num_perm
+        value = h >> 32
+        if value < bins[slot]:
+            bins[slot] = value
+    if _EMPTY_BIN in bins:
+        filled = [i for i, v in enumerate(bins) if v != _EMPTY_BIN]
+        for i in range(num_perm):
+            if bins[i] == _EMPTY_BIN:
+                # Nearest non-empty bin to the right (circularly), mixed with the distance
+                j = next((k for k in filled if k > i), filled[0])
+                distance = (j - i) % num_perm
+                bins[i] = (bins[j] + distance * 0x9E3779B1) & 0xFFFFFFFF
+    return array("I", bins)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures of the same length."""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def lsh_params(threshold: float, num_perm: int) -> tuple:
+    """
+    (bands, rows) for LSH candidate search. The candidate threshold
+    (1/bands)^(1/rows) is aimed a little below `threshold`: extra candidates
+    are cheap to reject by signature similarity, missed ones are lost.
+    """
+    target = max(0.05, threshold - 0.1)
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - target)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over the signatures of kept documents: `add()` returns the
+    kept document a new signature duplicates (with their similarity), or
+    indexes it and returns None. Documents are compared only with those
+    sharing at least one band of `rows` signature values. Each band key
+    keeps up to BUCKET_SIZE documents (a bare ordinal while there is only
+    one, to save memory), so a document sharing a band with several kept
+    ones is compared with all of them.
+    """
+
+    BUCKET_SIZE = 8
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = array("I")
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _keys(self, signature: array) -> list:
+        r = self.rows
+        return [hash(signature[b * r:(b + 1) * r].tobytes()) for b in range(self.bands)]
+
+    def add(self, doc_id: str, signature: array) -> Optional[tuple]:
+        keys = self._keys(signature)
+        seen = set()
+        for bucket, key in zip(self._buckets, keys):
+            entry = bucket.get(key)
+            if entry is None:
+                continue
+            for candidate in (entry,) if isinstance(entry, int) else entry:
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                start = candidate * self.num_perm
+                score = similarity(signature, self._signatures[start:start + self.num_perm])
+                if score >= self.threshold:
+                    return self.ids[candidate], score
+        ordinal = len(self.ids)
+        self.ids.append(doc_id)
+        self._signatures.extend(signature)
+        for bucket, key in zip(self._buckets, keys):
+            entry = bucket.get(key)
+            if entry is None:
+                bucket[key] = ordinal
+            elif isinstance(entry, int):
+                bucket[key] = [entry, ordinal]
+            elif len(entry) < self.BUCKET_SIZE:
+                entry.append(ordinal)
+        return None
+
+
+def detect_language(text: str) -> str:
+    """langdetect's language code for the start of `text` ("unknown" if it can't tell)."""
+    from langdetect import DetectorFactory, detect
+    from langdetect.lang_detect_exception import LangDetectException
+
+    # Deterministic results across runs and worker processes
+    DetectorFactory.seed = 0
+    try:
+        return detect(text[:DETECT_CHARS])
+    except LangDetectException:
+        return UNKNOWN_LANGUAGE
+
+
+def language_allowed(language: str, languages: Sequence[str]) -> bool:
+    """True if `language` (e.g. "zh-cn") or its base code ("zh") is in `languages`."""
+    return language in languages or language.split("-")[0] in languages
+
+
+def _analyze(text: str, languages: Optional[Sequence[str]], dedup: bool,
+             num_perm: int, shingle_size: int) -> tuple:
+    """Worker step: (detected language or None, signature bytes or None)."""
+    language = detect_language(text) if languages else None
+    if language is not None and not language_allowed(language, languages):
+        return language, None
+    signature = minhash_signature(text, num_perm, shingle_size) if dedup else None
+    return language, signature.tobytes() if signature is not None else None
+
+
+def _signature(payload: bytes) -> array:
+    signature = array("I")
+    signature.frombytes(payload)
+    return signature
+
+
+def iter_documents(folder: str) -> Iterator[dict]:
+    """
+    Stream every transcript under `folder`, one at a time and in a stable
+    order: {"id", "text", "url", "language", "token_count", "source",
+    "fetched_at"}, where source is the path relative to `folder`
+    ("<dir>/.store/<id>" for store records). Unreadable files are skipped.
+    """
+    from core.transcript_store import TranscriptStore
+
+    for kind, path, _ in iter_entries(folder):
+        if kind == "store":
+            store_rel = os.path.relpath(os.path.join(path, TranscriptStore.DIRNAME), folder)
+            for record in TranscriptStore.open(path).iter_records():
+                doc_id = record.get("video_id", "")
+                yield _document(doc_id, record, os.path.join(store_rel, doc_id))
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable {path}: {e}")
+            continue
+        if not isinstance(data, dict) or "raw_content" not in data:
+            continue
+        doc_id = os.path.basename(path)[:-len(".json")]
+        yield _document(doc_id, data, os.path.relpath(path, folder))
+
+
+def _document(doc_id: str, data: dict, source: str) -> dict:
+    return {
+        "id": doc_id,
+        "text": data.get("raw_content") or "",
+        "url": data.get("url"),
+        "language": data.get("language"),
+        "token_count": data.get("token_count"),
+        "source": source,
+        "fetched_at": data.get("fetched_at")
+    }
+
+
+class ShardWriter:
+    """
+    Packs JSONL lines into shards of at most `max_bytes` (uncompressed) and
+    `max_tokens`, gzip-compressing and writing finished shards on a thread
+    pool (zlib releases the GIL) while the next one fills. At most
+    `workers` shards are in flight, which bounds memory.
+    """
+
+    def __init__(self, out_dir: str, prefix: str = "part", max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_tokens: Optional[int] = None, compress: bool = True, workers: int = 4):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.compress = compress
+        self.workers = max(1, workers)
+        self.shards: List[dict] = []
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="shard-writer")
+        self._pending = deque()
+        self._lines: List[bytes] = []
+        self._bytes = 0
+        self._tokens = 0
+
+    def add(self, record: dict, tokens: int) -> None:
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        if self._lines and (self._bytes + len(line) > self.max_bytes
+                            or (self.max_tokens and self._tokens + tokens > self.max_tokens)):
+            self._roll()
+        self._lines.append(line)
+        self._bytes += len(line)
+        self._tokens += tokens
+
+    def _roll(self) -> None:
+        name = f"{self.prefix}-{len(self.shards) + len(self._pending):05d}.jsonl" + (".gz" if self.compress else "")
+        payload = b"".join(self._lines)
+        self._pending.append(self._pool.submit(self._write, name, payload, len(self._lines), self._tokens))
+        self._lines, self._bytes, self._tokens = [], 0, 0
+        while len(self._pending) >= self.workers:
+            self.shards.append(self._pending.popleft().result())
+
+    def _write(self, name: str, payload: bytes, records: int, tokens: int) -> dict:
+        data = gzip.compress(payload, compresslevel=6, mtime=0) if self.compress else payload
+        write_bytes_atomic(os.path.join(self.out_dir, name), data)
+        return {"file": name, "records": records, "tokens": tokens, "bytes": len(payload),
+                "compressed_bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+    def close(self) -> List[dict]:
+        """Write the last shard, wait for every write and return the shard list in order."""
+        try:
+            if self._lines:
+                self._roll()
+            while self._pending:
+                self.shards.append(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown()
+        return self.shards
+
+
+class DatasetExporter:
+    """
+    Streams the transcripts under `target_folder` (a project or subproject
+    directory) into shards in `out_dir` (default `<target_folder>/.dataset`,
+    hidden so it is neither listed as a subproject nor scanned), described
+    by `<out_dir>/.dataset.json`. Near-duplicates dropped by the dedup step
+    are listed in `<out_dir>/duplicates.jsonl`.
+
+    The export is written to a temporary sibling directory and swapped in
+    once complete, so a failed or interrupted run leaves the previous
+    export untouched.
+    """
+
+    DIRNAME = ".dataset"
+    MANIFEST = ".dataset.json"
+    DUPLICATES = "duplicates.jsonl"
+
+    def __init__(self, target_folder: str, out_dir: Optional[str] = None, prefix: str = "part",
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_tokens: Optional[int] = None,
+                 languages: Optional[Iterable[str]] = None, min_tokens: int = 0,
+                 dedup: bool = True, threshold: float = DEFAULT_THRESHOLD,
+                 num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                 compress: bool = True, workers: Optional[int] = None):
+        self.target_folder = target_folder
+        self.out_dir = out_dir or os.path.join(target_folder, self.DIRNAME)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.languages = sorted({code.strip().lower() for code in languages or () if code.strip()})
+        self.min_tokens = min_tokens
+        self.dedup = dedup
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.compress = compress
+        self.workers = workers or os.cpu_count() or 1
+
+    def _check_out_dir(self) -> None:
+        """Refuse to replace a directory that holds anything but an earlier export."""
+        out_dir = os.path.abspath(self.out_dir)
+        target = os.path.abspath(self.target_folder)
+        if out_dir == target or target.startswith(out_dir + os.sep):
+            raise ValueError(f"Output directory {self.out_dir} would replace the transcripts it exports")
+        if (os.path.isdir(out_dir) and os.listdir(out_dir)
+                and not os.path.exists(os.path.join(out_dir, self.MANIFEST))):
+            raise ValueError(f"{self.out_dir} is not empty and holds no earlier export; choose another --out")
+
+    def _swap_in(self, tmp_dir: str) -> None:
+        """Replace out_dir (if any) with the finished export in tmp_dir."""
+        if not os.path.exists(self.out_dir):
+            os.replace(tmp_dir, self.out_dir)
+            return
+        old_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(self.out_dir)}.old-",
+                                   dir=os.path.dirname(tmp_dir))
+        os.rmdir(old_dir)
+        os.replace(self.out_dir, old_dir)
+        try:
+            os.replace(tmp_dir, self.out_dir)
+        except OSError:
+            os.replace(old_dir, self.out_dir)
+            raise
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _analyzed(self, docs: Iterable[dict], pool: Optional["Executor"]) -> Iterator[tuple]:
+        """
+        Yield (document, language, signature) in input order. Batches go to
+        the process pool one ahead of the consumer, so reading files and
+        writing shards overlap with detection and hashing.
+        """
+        analyze = partial(_analyze, languages=self.languages, dedup=self.dedup,
+                          num_perm=self.num_perm, shingle_size=self.shingle_size)
+        if pool is None:
+            for doc in docs:
+                yield (doc, *analyze(doc["text"]))
+            return
+        pending = deque()
+        batch = []
+
+        def submit(batch: list) -> None:
+            pending.append((batch, pool.map(analyze, [d["text"] for d in batch], chunksize=8)))
+
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= BATCH_SIZE:
+                submit(batch)
+                batch = []
+                if len(pending) > 1:
+                    done, results = pending.popleft()
+                    for item in zip(done, results):
+                        yield (item[0], *item[1])
+        if batch:
+            submit(batch)
+        while pending:
+            done, results = pending.popleft()
+            for item in zip(done, results):
+                yield (item[0], *item[1])
+
+    def export(self, on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Run the export and return its summary (also written to the
+        manifest): counts of scanned, exported and dropped transcripts,
+        exported tokens, languages and the shard list. `on_progress(stats)`
+        is called after every BATCH_SIZE scanned transcripts.
+        """
+        self._check_out_dir()
+        parent = os.path.dirname(os.path.abspath(self.out_dir))
+        os.makedirs(parent, exist_ok=True)
+        # Hidden, so scanners and the project list skip it while it fills
+        tmp_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(self.out_dir)}.tmp-", dir=parent)
+        try:
+            summary = self._export(tmp_dir, on_progress)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._swap_in(tmp_dir)
+        return summary
+
+    def _export(self, tmp_dir: str, on_progress: Optional[Callable[[dict], None]]) -> dict:
+        stats = {"scanned": 0, "exported": 0, "tokens": 0, "empty": 0, "too_short": 0,
+                 "language_filtered": 0, "near_duplicates": 0}
+        languages = {}
+        index = NearDuplicateIndex(self.threshold, self.num_perm) if self.dedup else None
+        writer = ShardWriter(tmp_dir, self.prefix, self.max_bytes, self.max_tokens,
+                             self.compress, min(self.workers, 4))
+
+        pool = None
+        if self.workers > 1 and (self.languages or self.dedup):
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+        duplicates_path = os.path.join(tmp_dir, self.DUPLICATES)
+        try:
+            with open(duplicates_path, "w", encoding="utf-8") as duplicates:
+                for doc, detected, signature in self._analyzed(iter_documents(self.target_folder), pool):
+                    stats["scanned"] += 1
+                    if on_progress and stats["scanned"] % BATCH_SIZE == 0:
+                        on_progress(dict(stats))
+                    if not doc["text"].strip():
+                        stats["empty"] += 1
+                        continue
+                    tokens = doc["token_count"]
+                    if not isinstance(tokens, int):
+                        tokens = count_tokens(doc["text"])
+                    if tokens < self.min_tokens:
+                        stats["too_short"] += 1
+                        continue
+                    if detected is not None:
+                        if not language_allowed(detected, self.languages):
+                            stats["language_filtered"] += 1
+                            continue
+                        doc["language"] = detected
+                    if index is not None and signature is not None:
+                        match = index.add(doc["id"], _signature(signature))
+                        if match is not None:
+                            stats["near_duplicates"] += 1
+                            duplicates.write(json.dumps({"id": doc["id"], "source": doc["source"],
+                                                         "duplicate_of": match[0],
+                                                         "similarity": round(match[1], 3)}) + "\n")
+                            continue
+                    doc["token_count"] = tokens
+                    writer.add(doc, tokens)
+                    stats["exported"] += 1
+                    stats["tokens"] += tokens
+                    key = doc["language"] or UNKNOWN_LANGUAGE
+                    languages[key] = languages.get(key, 0) + 1
+        finally:
+            shards = writer.close()
+            if pool is not None:
+                pool.shutdown()
+
+        summary = {
+            "source": os.path.abspath(self.target_folder),
+            **stats,
+            "languages": dict(sorted(languages.items(), key=lambda kv: -kv[1])),
+            "settings": {"max_bytes": self.max_bytes, "max_tokens": self.max_tokens,
+                         "language_filter": self.languages or None, "min_tokens": self.min_tokens,
+                         "dedup": self.dedup, "threshold": self.threshold, "num_perm": self.num_perm,
+                         "shingle_size": self.shingle_size, "compress": self.compress},
+            "shards": shards
+        }
+        write_json_atomic(os.path.join(tmp_dir, self.MANIFEST), summary, ensure_ascii=False, indent=2)
+        return summary
+
+
+def export_dataset(target_folder: str, out_dir: Optional[str] = None, **options) -> dict:
+    """Convenience wrapper: DatasetExporter(target_folder, out_dir, **options).export()."""
+    return DatasetExporter(target_folder, out_dir, **options).export()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.dataset_exporter",
+                                     description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("folder", help="Project or subproject directory, e.g. output/MyProject")
+    parser.add_argument("--out", help="Output directory (default: <folder>/.dataset)")
+    parser.add_argument("--prefix", default="part", help="Shard file name prefix")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="Max uncompressed MiB per shard")
+    parser.add_argument("--max-tokens", type=int, help="Max tokens per shard")
+    parser.add_argument("--languages", default="",
+                        help="Comma-separated language codes to keep, as detected by langdetect (default: all)")
+    parser.add_argument("--min-tokens", type=int, default=0, help="Drop transcripts shorter than this")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate transcripts")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity from which a transcript is a near-duplicate")
+    parser.add_argument("--no-compress", action="store_true", help="Write plain .jsonl shards")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for detection/hashing")
+    args = parser.parse_args(argv)
+
+    exporter = DatasetExporter(
+        args.folder, args.out, prefix=args.prefix, max_bytes=int(args.max_mb * 2**20),
+        max_tokens=args.max_tokens, languages=args.languages.split(","), min_tokens=args.min_tokens,
+        dedup=not args.no_dedup, threshold=args.threshold, compress=not args.no_compress,
+        workers=args.workers
+    )
+
+    def report(stats: dict) -> None:
+        print(f"scanned {stats['scanned']}, exported {stats['exported']}, "
+              f"duplicates {stats['near_duplicates']}, filtered {stats['language_filtered']}", file=sys.stderr)
+
+    summary = exporter.export(on_progress=report)
+    print(json.dumps({k: v for k, v in summary.items() if k not in ("shards", "settings")}, ensure_ascii=False))
+    print(f"{len(summary['shards'])} shard(s) in {exporter.out_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
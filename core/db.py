@@ -0,0 +1,23 @@
+# core/db.py
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def connect(db_path: str, wal: bool = True, row_factory=None):
+    """
+    Open `db_path` for one transaction: committed when the block exits
+    normally, rolled back on error, and always closed. Connections are made
+    per call so callers can be used from any thread. WAL lets readers run
+    alongside a writer.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    try:
+        if wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,198 @@
+# core/fetch_engine.py
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+from core.scheduler import RequestScheduler
+from core.metrics import get_metrics
+from core.manifest import PlaylistManifest, DONE, FAILED, NO_TRANSCRIPT, BLOCKED
+from core.project_manager import settings_for_path
+from core.transcript_scraper import (
+    get_video_id,
+    cached_transcripts,
+    fetch_transcripts,
+    format_output,
+    save_output
+)
+
+if TYPE_CHECKING:
+    from core.proxy_pool import ProxyPool
+
+def iter_video_ids(urls: Iterable[str]) -> Iterator[str]:
+    """Lazily turn video URLs/IDs into video IDs, skipping ones that can't be parsed."""
+    for url in urls:
+        try:
+            yield get_video_id(url)
+        except ValueError as e:
+            print(e)
+
+
+def fetch_and_save(video_id: str, output_dir: str, language: Union[str, Sequence[str], None] = None,
+                   scheduler: Optional[RequestScheduler] = None,
+                   proxy_pool: Optional["ProxyPool"] = None) -> dict:
+    """
+    Fetch, format and save a single video's transcript. With a scheduler,
+    the fetch is rate limited and retried with backoff while blocked; with a
+    proxy pool, each attempt goes out through the healthiest proxy.
+
+    `language` is a code or a preference chain (e.g. ["id", "en", "auto"]);
+    by default the project's "languages" setting is used. With the project's
+    "all_languages" setting, every language of the chain the video has is
+    saved: the first as <video_id>.json, others as <video_id>.<language>.json.
+
+    Returns a result dict: {"video_id", "status", "path", "error", "languages"}
+    where status is one of the manifest statuses ("done", "no-transcript",
+    "blocked", "failed"), path is the first language's output and languages
+    lists the codes saved.
+    """
+    result = {"video_id": video_id, "status": FAILED, "path": None, "error": None, "languages": []}
+    settings = settings_for_path(output_dir)
+    languages = settings["languages"] if language is None else language
+    all_languages = settings["all_languages"]
+
+    def fetch():
+        if proxy_pool is None:
+            return fetch_transcripts(video_id, languages, all_languages=all_languages)
+        endpoint = proxy_pool.acquire()
+        start = time.monotonic()
+        try:
+            fetched = fetch_transcripts(video_id, languages, endpoint.api, endpoint.session, all_languages)
+        except Exception:
+            proxy_pool.release(endpoint, time.monotonic() - start, "error")
+            raise
+        proxy_pool.release(endpoint, time.monotonic() - start,
+                           "blocked" if fetched[1] == "blocked" else "ok")
+        return fetched
+
+    try:
+        # Cache hits skip the rate limiter and proxy pool altogether
+        fetched = cached_transcripts(video_id, languages, all_languages)
+        if fetched is not None:
+            transcripts, fetch_status, fetched_at = fetched
+        elif scheduler is not None:
+            fetched = scheduler.execute(fetch, lambda r: r[1] == "blocked")
+            if fetched is None:
+                result["error"] = "cancelled"
+                return result
+            transcripts, fetch_status, fetched_at = fetched
+        else:
+            transcripts, fetch_status, fetched_at = fetch()
+        if not transcripts:
+            result["status"] = BLOCKED if fetch_status == "blocked" else NO_TRANSCRIPT
+            return result
+        for i, (code, segments) in enumerate(transcripts):
+            name = video_id if i == 0 else f"{video_id}.{code}"
+            data = format_output(segments, video_id, code, fetched_at)
+            path = save_output(data, name, output_dir, segments=segments)
+            result["path"] = result["path"] or path
+            result["languages"].append(code)
+        result["status"] = DONE
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        get_metrics().inc("transcript_results_total", status=result["status"])
+    return result
+
+
+def _finish(future, manifest, done: int, total: Optional[int], on_progress) -> dict:
+    result = future.result()
+    if manifest is not None:
+        manifest.record(result["video_id"], result["status"], result["error"])
+    if on_progress:
+        on_progress(done, total, result)
+    return result
+
+
+def run_jobs(jobs: Iterable[tuple], max_workers: int = 4,
+             language: Union[str, Sequence[str], None] = None,
+             on_progress: Optional[Callable[[int, Optional[int], dict], None]] = None,
+             scheduler: Optional[RequestScheduler] = None,
+             proxy_pool: Optional["ProxyPool"] = None,
+             total: Optional[int] = None) -> Iterator[dict]:
+    """
+    Lower-level form of run_fetches for videos bound for different
+    directories: `jobs` yields (video_id, output_dir, manifest) tuples, where
+    manifest may be None. Nothing is skipped here; every outcome is recorded
+    in the job's manifest. Other arguments are as for run_fetches.
+    """
+    # Keep a bounded window of unfinished work so lazy inputs are not drained
+    # up front. Finished results wait in `pending` until everything submitted
+    # before them is done, so they are still reported in input order, but a
+    # video stuck in backoff doesn't stop the other workers.
+    window = max(1, max_workers * 2)
+    pending = deque()
+    unfinished = set()
+    done = 0
+    manifests = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for vid, output_dir, manifest in jobs:
+            future = executor.submit(fetch_and_save, vid, output_dir, language, scheduler, proxy_pool)
+            pending.append((future, manifest))
+            unfinished.add(future)
+            if manifest is not None:
+                manifests[id(manifest)] = manifest
+            while len(unfinished) >= window:
+                _, unfinished = wait(unfinished, return_when=FIRST_COMPLETED)
+            while pending and pending[0][0].done():
+                done += 1
+                yield _finish(*pending.popleft(), done, total, on_progress)
+        while pending:
+            done += 1
+            yield _finish(*pending.popleft(), done, total, on_progress)
+    finally:
+        # Consumer stopped early (or an error escaped): drop queued work
+        # and wake up workers sleeping in the scheduler
+        if scheduler is not None and pending:
+            scheduler.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Manifests batch their writes; persist whatever was recorded
+        for manifest in manifests.values():
+            manifest.flush()
+
+
+def run_fetches(video_ids: Iterable[str], output_dir: str, max_workers: int = 4,
+                language: Union[str, Sequence[str], None] = None,
+                on_progress: Optional[Callable[[int, Optional[int], dict], None]] = None,
+                manifest: Optional[PlaylistManifest] = None, max_attempts: int = 3,
+                scheduler: Optional[RequestScheduler] = None,
+                proxy_pool: Optional["ProxyPool"] = None) -> Iterator[dict]:
+    """
+    Fetch transcripts for many videos through a bounded worker pool.
+
+    Args:
+        video_ids: Video IDs to fetch; may be a lazy iterable (e.g. a playlist
+            that is still being enumerated).
+        output_dir: Directory the JSON files are written to.
+        max_workers: Number of worker threads.
+        language: Transcript language code or preference chain; defaults to
+            the project's "languages" setting.
+        on_progress: Called as on_progress(done, total, result) for every
+            finished video, in input order, from the consuming thread.
+        manifest: If given, videos already done (or out of retries) are skipped
+            and every result is recorded in it.
+        max_attempts: Attempts allowed per video before it is no longer retried.
+        scheduler: Rate limiter / backoff / circuit breaker shared by all
+            workers (see core.scheduler).
+        proxy_pool: Spread requests over several proxies / Tor instances
+            (see core.proxy_pool) instead of the shared session.
+
+    Yields:
+        One result dict per video (see fetch_and_save), in input order.
+    """
+    total = len(video_ids) if hasattr(video_ids, "__len__") else None
+    if manifest is not None:
+        video_ids = manifest.pending(video_ids, max_attempts)
+        if total is not None:
+            video_ids = list(video_ids)
+            total = len(video_ids)
+    jobs = ((vid, output_dir, manifest) for vid in video_ids)
+    try:
+        yield from run_jobs(jobs, max_workers, language, on_progress,
+                            scheduler, proxy_pool, total)
+    finally:
+        # Legacy outputs adopted by pending() even if nothing was fetched
+        if manifest is not None:
+            manifest.flush()
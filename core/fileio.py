@@ -0,0 +1,128 @@
+# core/fileio.py
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+T = TypeVar("T")
+
+# How many directory levels find_upwards climbs (output/<project>/<sub>/<playlist>/... fits easily)
+MAX_ANCESTOR_DEPTH = 8
+# A lookup that found nothing is repeated after this long, so markers
+# created later (an index, a project's .project.json) are picked up
+NOT_FOUND_TTL = 5.0
+_FIND_CACHE_MAX = 4096
+_find_cache: dict = {}
+_shared: dict = {}
+_shared_lock = threading.Lock()
+
+
+def write_json_atomic(path: str, data, **dump_kwargs) -> None:
+    """
+    Write `data` as JSON to `path` so readers only ever see the old or the
+    complete new file: dump to a temp file in the same directory, then rename.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_bytes_atomic(path: str, payload: bytes) -> None:
+    """Binary counterpart of write_json_atomic."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive inter-process lock on `path` (created if missing) for
+    the duration of the block. Threads of one process must still serialize
+    among themselves; the lock is per open file on some platforms.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def find_upwards(directory: str, marker: str) -> Optional[str]:
+    """
+    Return the nearest of `directory` and its ancestors (up to
+    MAX_ANCESTOR_DEPTH levels) that contains `marker`, or None. Results are
+    cached per directory: a hit is re-checked with a single stat, a miss is
+    trusted for NOT_FOUND_TTL seconds.
+    """
+    key = (os.path.abspath(directory), marker)
+    now = time.monotonic()
+    cached = _find_cache.get(key)
+    if cached is not None:
+        found, checked_at = cached
+        if found is not None and os.path.exists(os.path.join(found, marker)):
+            return found
+        if found is None and now - checked_at < NOT_FOUND_TTL:
+            return None
+    found, current = None, key[0]
+    for _ in range(MAX_ANCESTOR_DEPTH):
+        if os.path.exists(os.path.join(current, marker)):
+            found = current
+            break
+        parent = os.path.dirname(current)
+        if parent == current:
+            break
+        current = parent
+    if len(_find_cache) >= _FIND_CACHE_MAX:
+        _find_cache.clear()
+    _find_cache[key] = (found, now)
+    return found
+
+
+def clear_find_cache() -> None:
+    """Forget cached find_upwards results; call after creating a marker file or directory."""
+    _find_cache.clear()
+
+
+def shared_instance(factory: Callable[[str], T], root: str) -> T:
+    """One `factory(root)` per class and root for the whole process (e.g. StatsIndex(output_root))."""
+    key = (factory, os.path.abspath(root))
+    with _shared_lock:
+        instance = _shared.get(key)
+        if instance is None:
+            instance = _shared[key] = factory(root)
+        return instance
@@ -0,0 +1,540 @@
+# core/job_runner.py
+"""
+Background ingestion jobs.
+
+    python -m core.job_runner submit urls.txt --project MyProject --subproject Nightly
+    python -m core.job_runner serve --workers 2
+    python -m core.job_runner list
+    python -m core.job_runner cancel JOB_ID
+    python -m core.job_runner prune-blobs
+
+Jobs (a list of video/playlist URLs bound for a project directory) are
+queued in `<output_root>/.jobs.sqlite` and run by a pool of worker
+threads, either inside the Streamlit app or in a `serve` process. Progress,
+per-video results and cancellation requests go through the same database,
+so any process can submit, poll or cancel. Jobs left running by a process
+that died are picked up again once their heartbeat goes stale; playlist
+manifests make the restart cheap.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import secrets
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from core.db import connect
+from core.metrics import get_metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id               TEXT PRIMARY KEY,
+    project          TEXT NOT NULL,
+    subproject       TEXT,
+    inputs           TEXT NOT NULL,       -- JSON list of URLs / IDs
+    options          TEXT NOT NULL,       -- JSON dict, see JobQueue.submit
+    status           TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    submitted_at     REAL NOT NULL,
+    started_at       REAL,
+    finished_at      REAL,
+    heartbeat        REAL,
+    worker           TEXT,
+    done             INTEGER NOT NULL DEFAULT 0,
+    listed           INTEGER NOT NULL DEFAULT 0,
+    total            INTEGER,             -- known once every input is enumerated
+    counts           TEXT NOT NULL DEFAULT '{}',
+    error            TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id  TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    ts      REAL NOT NULL,
+    event   TEXT NOT NULL,                -- JSON, as emitted by core.batch / run_jobs
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+# Running jobs whose worker has not checked in for this long are requeued
+STALE_AFTER = 60.0
+# Progress and events are written at most this often per job
+FLUSH_INTERVAL = 1.0
+# Proxy pools (one per distinct Tor port / URL configuration) kept for reuse
+MAX_PROXY_POOLS = 8
+
+DEFAULT_OPTIONS = {
+    "workers": 4,             # fetch threads within the job
+    "language": None,         # code or chain; None = the project's setting
+    "max_attempts": 3,
+    "playlist_ttl_hours": 6.0,
+    "tor_ports": [],
+    "proxy_urls": [],
+}
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["inputs"] = json.loads(job["inputs"])
+    job["options"] = json.loads(job["options"])
+    job["counts"] = json.loads(job["counts"])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    job["progress"] = job["done"] / job["total"] if job["total"] else (1.0 if job["status"] == COMPLETED else 0.0)
+    return job
+
+
+class JobQueue:
+    """Persistent job queue, progress and event log in `<output_root>/.jobs.sqlite`."""
+
+    FILENAME = ".jobs.sqlite"
+
+    def __init__(self, output_root: str):
+        self.output_root = output_root
+        self.db_path = os.path.join(output_root, self.FILENAME)
+        os.makedirs(output_root, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return connect(self.db_path, row_factory=sqlite3.Row)
+
+    def submit(self, project: str, inputs: Sequence[str], subproject: Optional[str] = None,
+               **options) -> str:
+        """Queue a job; `options` override DEFAULT_OPTIONS. Returns the job ID."""
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown job options: {', '.join(sorted(unknown))}")
+        inputs = [line.strip() for line in inputs if line.strip() and not line.strip().startswith("#")]
+        if not inputs:
+            raise ValueError("A job needs at least one URL or video ID")
+        job_id = time.strftime("%Y%m%d-%H%M%S") + "-" + secrets.token_hex(3)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, project, subproject, inputs, options, status, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, project, subproject or None, json.dumps(inputs, ensure_ascii=False),
+                 json.dumps({**DEFAULT_OPTIONS, **options}), QUEUED, time.time())
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(self, statuses: Optional[Iterable[str]] = None, project: Optional[str] = None,
+             limit: int = 50) -> List[dict]:
+        """Most recently submitted jobs first, optionally filtered by status and project."""
+        sql, params = "SELECT * FROM jobs WHERE 1 = 1", []
+        if statuses:
+            statuses = list(statuses)
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params += statuses
+        if project:
+            sql += " AND project = ?"
+            params.append(project)
+        sql += " ORDER BY submitted_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return [_row_to_job(row) for row in conn.execute(sql, params)]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job outright, or ask the worker running it to stop.
+        Returns False if the job does not exist or has already finished.
+        """
+        with self._connect() as conn:
+            cur = conn.execute("UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? "
+                               "WHERE id = ? AND status = ?", (CANCELLED, time.time(), job_id, QUEUED))
+            if cur.rowcount:
+                return True
+            cur = conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                               (job_id, RUNNING))
+            return bool(cur.rowcount)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """Atomically take the oldest queued (or stale running) job for `worker`."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # A dead worker's job that was being cancelled needs no restart
+            conn.execute("UPDATE jobs SET status = ?, finished_at = ? "
+                         "WHERE status = ? AND heartbeat < ? AND cancel_requested = 1",
+                         (CANCELLED, now, RUNNING, now - STALE_AFTER))
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? AND cancel_requested = 0) "
+                "OR (status = ? AND heartbeat < ?) ORDER BY submitted_at LIMIT 1",
+                (QUEUED, RUNNING, now - STALE_AFTER)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, worker = ?, heartbeat = ?, "
+                         "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                         (RUNNING, worker, now, now, row[0]))
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row[0],)).fetchone()
+        return _row_to_job(job)
+
+    def heartbeat(self, job_ids: Sequence[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ?",
+                             [(time.time(), job_id, RUNNING) for job_id in job_ids])
+
+    def update(self, job_id: str, done: int, listed: int, total: Optional[int], counts: dict,
+               events: Sequence[dict] = ()) -> None:
+        """Record progress and append `events` to the job's event log."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET done = ?, listed = ?, total = ?, counts = ?, heartbeat = ? WHERE id = ?",
+                         (done, listed, total, json.dumps(counts), now, job_id))
+            if events:
+                seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = ?",
+                                   (job_id,)).fetchone()[0]
+                conn.executemany("INSERT INTO job_events VALUES (?, ?, ?, ?)",
+                                 [(job_id, seq + i, now, json.dumps(event, ensure_ascii=False))
+                                  for i, event in enumerate(events, start=1)])
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                         (status, error, time.time(), job_id))
+
+    def requeue(self, job_id: str) -> None:
+        """Put a running job back in the queue (worker shutting down); it resumes from its manifests."""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, worker = NULL WHERE id = ? AND status = ?",
+                         (QUEUED, job_id, RUNNING))
+
+    def events(self, job_id: str, after: int = 0, limit: int = 500) -> List[dict]:
+        """Events of a job with sequence number > `after`, oldest first; each carries its "seq"."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? "
+                                "ORDER BY seq LIMIT ?", (job_id, after, limit)).fetchall()
+        return [{"seq": seq, **json.loads(event)} for seq, event in rows]
+
+    def purge(self, older_than_days: float = 30) -> int:
+        """Delete finished jobs (and their events) older than the given age. Returns the number deleted."""
+        cutoff = time.time() - older_than_days * 86400
+        with self._connect() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status NOT IN (?, ?) AND finished_at < ?", (*ACTIVE, cutoff))]
+            conn.executemany("DELETE FROM job_events WHERE job_id = ?", [(i,) for i in ids])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+
+class JobRunner:
+    """
+    Pool of `workers` threads running jobs from a JobQueue, each job with
+    its own fetch pool. All jobs share one request rate limit (`rate`
+    requests/s) and circuit breaker, so queueing more jobs does not get the
+    client blocked faster. A supervisor thread keeps heartbeats current and
+    turns cancellation requests (from any process) into a stop of the job's
+    scheduler, which aborts waits for rate limit tokens and backoff.
+    """
+
+    def __init__(self, output_root: str, workers: int = 2, rate: float = 2.0, poll: float = 1.0):
+        from core.scheduler import CircuitBreaker, TokenBucket
+
+        self.output_root = output_root
+        self.queue = JobQueue(output_root)
+        self.workers = workers
+        self.rate = rate
+        self.poll = poll
+        self.bucket = TokenBucket(rate, 4)
+        self.breaker = CircuitBreaker()
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._active = {}        # job_id -> RequestScheduler
+        self._proxy_pools = OrderedDict()
+        self._threads = []
+
+    def start(self) -> "JobRunner":
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """Stop taking jobs, interrupt running ones and requeue them."""
+        self._stop.set()
+        with self._lock:
+            for scheduler in self._active.values():
+                scheduler.stop()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # Convenience pass-throughs for callers holding only the runner
+    def submit(self, project: str, inputs: Sequence[str], subproject: Optional[str] = None, **options) -> str:
+        return self.queue.submit(project, inputs, subproject, **options)
+
+    def cancel(self, job_id: str) -> bool:
+        cancelled = self.queue.cancel(job_id)
+        with self._lock:
+            scheduler = self._active.get(job_id)
+        if scheduler is not None:
+            scheduler.stop()
+        return cancelled
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return list(self._active)
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(self.poll):
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            try:
+                self.queue.heartbeat(list(active))
+                for job_id, scheduler in active.items():
+                    if self.queue.cancel_requested(job_id):
+                        scheduler.stop()
+            except sqlite3.Error as e:
+                print(f"Job supervisor: {e}")
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.name)
+            except sqlite3.Error as e:
+                print(f"Job worker: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll)
+                continue
+            self._run(job)
+
+    def proxy_pool(self, tor_ports: Sequence[int], proxy_urls: Sequence[str], create: bool = True):
+        """
+        The runner's pool for these Tor ports / proxy URLs, or None. Pools
+        are built when a job first needs them and shared by later jobs with
+        the same configuration; the MAX_PROXY_POOLS most recently used are
+        kept. With create=False only an existing pool is returned (e.g. to
+        show its health without building one).
+        """
+        if not tor_ports and not proxy_urls:
+            return None
+        key = (tuple(tor_ports), tuple(proxy_urls))
+        with self._lock:
+            if key in self._proxy_pools:
+                self._proxy_pools.move_to_end(key)
+                return self._proxy_pools[key]
+            if not create:
+                return None
+            from core.proxy_pool import ProxyPool
+            pool = self._proxy_pools[key] = ProxyPool.from_config(tor_ports, proxy_urls)
+            while len(self._proxy_pools) > MAX_PROXY_POOLS:
+                # Jobs already running keep their reference to an evicted pool
+                self._proxy_pools.popitem(last=False)
+            return pool
+
+    def _run(self, job: dict) -> None:
+        from core.batch import expand_jobs
+        from core.fetch_engine import run_jobs
+        from core.playlist_cache import prefetch
+        from core.project_manager import ProjectManager
+        from core.scheduler import RequestScheduler
+
+        job_id, options = job["id"], job["options"]
+        scheduler = RequestScheduler(rate=self.rate, bucket=self.bucket, breaker=self.breaker)
+        with self._lock:
+            self._active[job_id] = scheduler
+        metrics = get_metrics()
+        metrics.inc("jobs_started_total")
+        # Events come from this thread and the enumeration (prefetch) thread
+        events_lock = threading.Lock()
+        events = []
+        counts = {}
+        progress = {"done": 0, "listed": 0, "total": None}
+        last_flush = 0.0
+
+        def emit(event: dict) -> None:
+            with events_lock:
+                events.append(event)
+
+        stats = {"duplicates": 0, "skipped": 0}
+
+        def flush() -> None:
+            with events_lock:
+                pending = events[:]
+                events.clear()
+            # Videos the manifests already have (e.g. when a requeued job
+            # resumes) count as done
+            skipped = stats["skipped"]
+            total = progress["total"] + skipped if progress["total"] is not None else None
+            self.queue.update(job_id, progress["done"] + skipped, progress["listed"] + skipped, total,
+                              {**counts, "skipped": skipped} if skipped else counts, pending)
+
+        def counted(items: Iterator[tuple]) -> Iterator[tuple]:
+            for item in items:
+                progress["listed"] += 1
+                yield item
+            progress["total"] = progress["listed"]
+
+        status, error = COMPLETED, None
+        jobs = None
+        try:
+            pm = ProjectManager(self.output_root)
+            if job["project"] not in pm.get_projects():
+                pm.create_project(job["project"])
+            base_dir = os.path.join(self.output_root, job["project"])
+            if job["subproject"]:
+                if job["subproject"] not in pm.get_subprojects(job["project"]):
+                    pm.create_subproject(job["project"], job["subproject"])
+                base_dir = os.path.join(base_dir, job["subproject"])
+
+            playlist_ttl = timedelta(hours=options["playlist_ttl_hours"])
+            jobs = prefetch(counted(expand_jobs(job["inputs"], base_dir, options["max_attempts"],
+                                                emit, stats, playlist_ttl)))
+            results = run_jobs(jobs, max_workers=options["workers"], language=options["language"],
+                               scheduler=scheduler,
+                               proxy_pool=self.proxy_pool(options["tor_ports"], options["proxy_urls"]))
+            try:
+                for result in results:
+                    progress["done"] += 1
+                    counts[result["status"]] = counts.get(result["status"], 0) + 1
+                    emit({"event": "result", "done": progress["done"], **result})
+                    if scheduler.stop_event.is_set():
+                        break
+                    if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                        flush()
+                        last_flush = time.monotonic()
+            finally:
+                results.close()
+            if scheduler.stop_event.is_set():
+                status = CANCELLED if self.queue.cancel_requested(job_id) else QUEUED
+            else:
+                emit({"event": "summary", **counts, **stats})
+        except Exception as e:
+            status, error = FAILED, str(e)
+            emit({"event": "error", "error": error})
+        finally:
+            if jobs is not None:
+                jobs.close()
+            with self._lock:
+                self._active.pop(job_id, None)
+            try:
+                flush()
+                if status == QUEUED:
+                    # Interrupted by stop(): another worker picks it up later
+                    self.queue.requeue(job_id)
+                else:
+                    self.queue.finish(job_id, status, error)
+            except sqlite3.Error as e:
+                print(f"Could not record the end of job {job_id}: {e}")
+            metrics.inc("jobs_finished_total", status=status)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m core.job_runner", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--output-root", default="output")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run queued jobs until interrupted")
+    serve.add_argument("--workers", type=int, default=2, help="Jobs run at the same time")
+    serve.add_argument("--rate", type=float, default=2.0, help="Max requests per second, over all jobs")
+    serve.add_argument("--direct", action="store_true", help="Don't route through Tor")
+    serve.add_argument("--cookies", default="cookies.txt")
+
+    submit = commands.add_parser("submit", help="Queue URLs/IDs from files ('-' is stdin) as one job")
+    submit.add_argument("inputs", nargs="*", default=["-"])
+    submit.add_argument("--project", required=True)
+    submit.add_argument("--subproject")
+    submit.add_argument("--workers", type=int, default=DEFAULT_OPTIONS["workers"], help="Fetch threads for this job")
+    submit.add_argument("--language", help="Language code or comma-separated preference chain")
+    submit.add_argument("--max-attempts", type=int, default=DEFAULT_OPTIONS["max_attempts"])
+
+    listing = commands.add_parser("list", help="Show recent jobs")
+    listing.add_argument("--active", action="store_true", help="Only queued and running jobs")
+    listing.add_argument("--limit", type=int, default=20)
+
+    cancel = commands.add_parser("cancel", help="Cancel a queued or running job")
+    cancel.add_argument("job_id")
+
+    commands.add_parser("prune-blobs", help="Delete shared transcript blobs no output file uses any more")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    queue = JobQueue(args.output_root)
+
+    if args.command == "submit":
+        from core.batch import read_inputs
+        job_id = queue.submit(args.project, list(read_inputs(args.inputs)), args.subproject,
+                              workers=args.workers, language=args.language, max_attempts=args.max_attempts)
+        print(job_id)
+        return 0
+
+    if args.command == "list":
+        for job in queue.list(ACTIVE if args.active else None, limit=args.limit):
+            total = job["total"] if job["total"] is not None else f"{job['listed']}+"
+            target = job["project"] + (f"/{job['subproject']}" if job["subproject"] else "")
+            flag = " (cancelling)" if job["cancel_requested"] and job["status"] == RUNNING else ""
+            print(f"{job['id']}  {job['status']}{flag:<13}  {job['done']}/{total}  {target}  "
+                  f"{json.dumps(job['counts'])}")
+        return 0
+
+    if args.command == "prune-blobs":
+        from core.blob_store import BlobStore
+        blobs = BlobStore(args.output_root)
+        print(f"Removed {blobs.prune()} unused blob(s); {json.dumps(blobs.stats())}")
+        return 0
+
+    if args.command == "cancel":
+        if queue.cancel(args.job_id):
+            print(f"Cancelling {args.job_id}")
+            return 0
+        print(f"No queued or running job {args.job_id}", file=sys.stderr)
+        return 1
+
+    from core.blob_store import BlobStore
+    from core.response_cache import ResponseCache
+    from core.stats_index import StatsIndex
+    from core.transcript_scraper import create_http_client, set_response_cache
+
+    StatsIndex(args.output_root)
+    BlobStore(args.output_root)
+    set_response_cache(ResponseCache(args.output_root))
+    _, status = create_http_client(cookie_file=args.cookies, use_tor=not args.direct,
+                                   pool_maxsize=max(32, args.workers * DEFAULT_OPTIONS["workers"]))
+    print(f"Connection: {json.dumps(status)}")
+    runner = JobRunner(args.output_root, workers=args.workers, rate=args.rate).start()
+    print(f"Serving jobs from {queue.db_path} as {runner.name} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping; running jobs go back to the queue")
+    finally:
+        runner.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# core/manifest.py
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+from core.fileio import write_json_atomic
+from core.transcript_store import TranscriptStore
+
+# Statuses a video can end up in after an attempt
+DONE = "done"
+FAILED = "failed"
+NO_TRANSCRIPT = "no-transcript"
+BLOCKED = "blocked"
+RETRYABLE = (FAILED, BLOCKED)
+
+
+class PlaylistManifest:
+    """
+    Persistent record of what was attempted for a playlist directory.
+
+    Stored as `<playlist_dir>/.manifest.json` so a crashed run can be
+    resumed and re-runs only fetch videos that are missing or retryable.
+    Updates are written out atomically every FLUSH_EVERY records or
+    FLUSH_SECONDS, whichever comes first, and on flush(); a crash loses at
+    most that window, whose videos are then re-fetched or adopted again.
+    """
+
+    FILENAME = ".manifest.json"
+    FLUSH_EVERY = 100
+    FLUSH_SECONDS = 5.0
+
+    def __init__(self, playlist_dir: str, playlist_id: Optional[str] = None):
+        self.playlist_dir = playlist_dir
+        self.path = os.path.join(playlist_dir, self.FILENAME)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._last_flush = time.monotonic()
+        # IDs in the directory's TranscriptStore, read once when first needed
+        self._stored = None
+        self.data = {"playlist_id": playlist_id, "videos": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {e}")
+        if playlist_id:
+            self.data["playlist_id"] = playlist_id
+
+    @property
+    def videos(self) -> dict:
+        return self.data["videos"]
+
+    def _output_exists(self, video_id: str) -> bool:
+        if os.path.exists(os.path.join(self.playlist_dir, f"{video_id}.json")):
+            return True
+        if self._stored is None:
+            self._stored = (TranscriptStore.open(self.playlist_dir).video_ids()
+                            if TranscriptStore.exists_in(self.playlist_dir) else set())
+        return video_id in self._stored
+
+    def needs_fetch(self, video_id: str, max_attempts: int = 3) -> bool:
+        """Return True if `video_id` is missing or failed with attempts left."""
+        entry = self.videos.get(video_id)
+        if entry is None:
+            # Output written before manifests existed: adopt it as done
+            if self._output_exists(video_id):
+                self.record(video_id, DONE, count_attempt=False)
+                return False
+            return True
+        if entry["status"] == DONE:
+            return not self._output_exists(video_id)
+        if entry["status"] in RETRYABLE:
+            return entry["attempts"] < max_attempts
+        return False
+
+    def pending(self, video_ids: Iterable[str], max_attempts: int = 3) -> Iterator[str]:
+        """Lazily filter `video_ids` down to the ones that still need fetching."""
+        for vid in video_ids:
+            if self.needs_fetch(vid, max_attempts):
+                yield vid
+
+    def record(self, video_id: str, status: str, error: Optional[str] = None,
+               count_attempt: bool = True) -> None:
+        """Update a video's entry; persisted with the next (batched) flush."""
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            entry = self.videos.setdefault(video_id, {
+                "status": status,
+                "attempts": 0,
+                "first_attempt": now,
+                "last_attempt": now,
+                "error": None
+            })
+            entry["status"] = status
+            entry["last_attempt"] = now
+            entry["error"] = error
+            if count_attempt:
+                entry["attempts"] += 1
+            if status == DONE and self._stored is not None:
+                # Saved by this run, possibly into the store after it was read
+                self._stored.add(video_id)
+            self._unsaved += 1
+            if (self._unsaved >= self.FLUSH_EVERY
+                    or time.monotonic() - self._last_flush >= self.FLUSH_SECONDS):
+                self._write()
+
+    def flush(self) -> None:
+        """Write out any updates not yet persisted."""
+        with self._lock:
+            if self._unsaved:
+                self._write()
+
+    def _write(self) -> None:
+        write_json_atomic(self.path, self.data, ensure_ascii=False, indent=2)
+        self._unsaved = 0
+        self._last_flush = time.monotonic()
+
+    def summary(self) -> dict:
+        """Return a {status: count} breakdown of the manifest."""
+        counts = {}
+        for entry in self.videos.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
@@ -0,0 +1,260 @@
+# core/metrics.py
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from core.fileio import write_bytes_atomic
+
+# Histogram buckets (seconds), tuned for HTTP round-trips and local writes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Pipeline stages timed by span()
+STAGES = ("enumerate", "fetch", "fallback", "format", "save")
+# Span end times kept for rate() (covers a few minutes at high throughput)
+RECENT_SPANS = 10_000
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[dict] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with a sum and count."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Thread-safe, in-process metrics for the fetch pipeline: counters, gauges
+    and histograms keyed by name + labels, plus timed spans for the pipeline
+    stages. Listeners (e.g. JsonLogExporter) receive every finished span.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._recent = deque(maxlen=RECENT_SPANS)
+        self._listeners = []
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self.gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            key = _labels(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def record_span(self, stage: str, seconds: float, outcome: str = "ok", **fields) -> None:
+        """Record a finished stage: its duration histogram, outcome counter and listeners."""
+        self.observe("transcript_stage_seconds", seconds, stage=stage)
+        self.inc("transcript_stage_total", stage=stage, outcome=outcome)
+        now = time.time()
+        with self._lock:
+            self._recent.append((now, stage, outcome))
+            listeners = list(self._listeners)
+        if listeners:
+            event = {"ts": round(now, 3), "stage": stage, "seconds": round(seconds, 6),
+                     "outcome": outcome, **fields}
+            for listener in listeners:
+                listener(event)
+
+    @contextmanager
+    def span(self, stage: str, **fields) -> Iterator[dict]:
+        """
+        Time the enclosed block as `stage`. The yielded dict can be updated
+        with an "outcome" (default "ok"; "error" if the block raises) and any
+        extra fields for the span log.
+        """
+        info = {"outcome": "ok", **fields}
+        start = time.perf_counter()
+        try:
+            yield info
+        except BaseException:
+            info["outcome"] = "error"
+            raise
+        finally:
+            outcome = info.pop("outcome")
+            self.record_span(stage, time.perf_counter() - start, outcome, **info)
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def rate(self, stage: str, window: float = 60.0, outcome: Optional[str] = None) -> float:
+        """Spans of `stage` (optionally with `outcome`) finished per second over the last `window` seconds."""
+        cutoff = time.time() - window
+        with self._lock:
+            n = sum(1 for ts, s, o in self._recent
+                    if ts >= cutoff and s == stage and (outcome is None or o == outcome))
+        return n / window
+
+    def counter(self, name: str, **labels) -> float:
+        """Sum of `name` over every series matching the given labels."""
+        want = set(_labels(labels))
+        with self._lock:
+            return sum(v for key, v in self.counters.get(name, {}).items() if want <= set(key))
+
+    def stage_summary(self) -> list:
+        """One row per pipeline stage: count, error count, p50/p95/p99 and mean seconds."""
+        rows = []
+        with self._lock:
+            series = self.histograms.get("transcript_stage_seconds", {})
+            totals = self.counters.get("transcript_stage_total", {})
+            for stage in STAGES:
+                hist = series.get(_labels({"stage": stage}))
+                if hist is None:
+                    continue
+                errors = totals.get(_labels({"stage": stage, "outcome": "error"}), 0)
+                rows.append({
+                    "stage": stage,
+                    "count": hist.count,
+                    "errors": int(errors),
+                    "p50": round(hist.quantile(0.5), 4),
+                    "p95": round(hist.quantile(0.95), 4),
+                    "p99": round(hist.quantile(0.99), 4),
+                    "mean": round(hist.sum / hist.count, 4)
+                })
+        return rows
+
+    def to_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_format_labels(k)} {v:g}" for k, v in sorted(series.items()))
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{_format_labels(k)} {v:g}" for k, v in sorted(series.items()))
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(key, {'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically write the metrics for node_exporter's textfile collector."""
+        write_bytes_atomic(path, self.to_prometheus().encode("utf-8"))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self._recent.clear()
+            self.started = time.time()
+
+
+class JsonLogExporter:
+    """Listener appending every finished span to `path` as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event: dict) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusFileExporter:
+    """Background thread rewriting a Prometheus text file every `interval` seconds."""
+
+    def __init__(self, metrics: "Metrics", path: str, interval: float = 15.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.metrics.write_prometheus(self.path)
+
+    def start(self) -> "PrometheusFileExporter":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and write the final values."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.metrics.write_prometheus(self.path)
+
+
+# Process-wide registry used by the fetch pipeline
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
@@ -0,0 +1,181 @@
+# core/playlist_cache.py
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from core.fileio import write_json_atomic
+from core.metrics import get_metrics
+
+# How long an enumerated playlist is trusted before asking YouTube again
+DEFAULT_TTL = timedelta(hours=6)
+# Newest-first playlists: this many already-known videos in a row means the
+# rest of the playlist is what we already have (one page is 100 videos)
+KNOWN_RUN_TO_STOP = 100
+# Channel upload playlists ("UU" + channel ID) list the newest videos first
+NEWEST_FIRST_PREFIXES = ("UU",)
+
+
+class PlaylistCache:
+    """
+    Cached enumeration of one playlist, stored as `<playlist_dir>/.playlist.json`:
+    the ordered video IDs, when they were fetched and whether that listing
+    was complete.
+
+    iter_video_ids() yields the cached IDs straight away, then (when the
+    cache is stale) only the videos YouTube lists that it has not seen yet.
+    For newest-first playlists, enumeration stops as soon as it runs into
+    the videos it already knows, so a re-run costs one page of requests.
+    """
+
+    FILENAME = ".playlist.json"
+
+    def __init__(self, playlist_dir: str, playlist_id: str, ttl: timedelta = DEFAULT_TTL):
+        self.playlist_dir = playlist_dir
+        self.playlist_id = playlist_id
+        self.ttl = ttl
+        self.path = os.path.join(playlist_dir, self.FILENAME)
+        self.data = {"playlist_id": playlist_id, "video_ids": [], "fetched_at": None, "complete": False}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("playlist_id") == playlist_id:
+                    self.data = cached
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable playlist cache {self.path}: {e}")
+
+    @property
+    def video_ids(self) -> list:
+        return self.data["video_ids"]
+
+    @property
+    def newest_first(self) -> bool:
+        return self.playlist_id.startswith(NEWEST_FIRST_PREFIXES)
+
+    def is_fresh(self) -> bool:
+        """True if the cached listing is complete and younger than the TTL."""
+        if not self.data["complete"] or not self.data["fetched_at"]:
+            return False
+        fetched_at = datetime.fromisoformat(self.data["fetched_at"])
+        return datetime.now(timezone.utc) - fetched_at < self.ttl
+
+    def _save(self, video_ids: list, complete: bool, refreshed: bool) -> None:
+        self.data["video_ids"] = video_ids
+        self.data["complete"] = complete
+        if refreshed:
+            self.data["fetched_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        os.makedirs(self.playlist_dir, exist_ok=True)
+        write_json_atomic(self.path, self.data, ensure_ascii=False, indent=2)
+
+    def iter_video_ids(self, playlist_url: str, refresh: Optional[bool] = None) -> Iterator[str]:
+        """
+        Lazily yield every video ID of the playlist, each once: cached IDs
+        first, then newly listed ones as pages come in. `refresh` forces
+        (True) or skips (False) asking YouTube; by default that happens when
+        the cache is stale. Whatever was enumerated is saved, even if the
+        caller stops early or enumeration fails part way.
+        """
+        from core.transcript_scraper import get_video_id
+
+        cached = list(self.video_ids)
+        known = set(cached)
+        yield from cached
+        if refresh is False or (refresh is None and self.is_fresh()):
+            return
+
+        from pytube import Playlist
+
+        listed, new = [], []
+        run, finished, stopped_early = 0, False, False
+        metrics = get_metrics()
+        # Paging time only: time the consumer spends between items is excluded
+        paging = 0.0
+        started = time.perf_counter()
+        try:
+            for url in Playlist(playlist_url).url_generator():
+                vid = get_video_id(url)
+                listed.append(vid)
+                if vid in known:
+                    run += 1
+                    if self.newest_first and self.data["complete"] and run >= KNOWN_RUN_TO_STOP:
+                        stopped_early = True
+                        break
+                    continue
+                run = 0
+                known.add(vid)
+                new.append(vid)
+                paging += time.perf_counter() - started
+                started = None
+                yield vid
+                started = time.perf_counter()
+            finished = True
+        finally:
+            if started is not None:
+                paging += time.perf_counter() - started
+            outcome = "ok" if finished or stopped_early else "interrupted"
+            metrics.record_span("enumerate", paging, outcome, playlist_id=self.playlist_id,
+                                listed=len(listed), new=len(new), stopped_early=stopped_early)
+            metrics.inc("playlist_videos_listed_total", len(listed))
+            if stopped_early:
+                # Everything past this point is already cached, in order
+                self._save(new + cached, complete=True, refreshed=True)
+            elif finished:
+                self._save(list(dict.fromkeys(listed)), complete=True, refreshed=True)
+            elif new:
+                # Interrupted: keep what was found without marking the listing fresh
+                ordered = new + cached if self.newest_first else cached + new
+                self._save(ordered, complete=self.data["complete"], refreshed=False)
+
+
+def prefetch(items: Iterable, buffer: int = 1000) -> Iterator:
+    """
+    Run `items` on a background thread, up to `buffer` ahead of the
+    consumer, and yield them in order. Lets slow producers (playlist
+    enumeration) overlap with the work done on each item. Errors raised
+    by the producer are re-raised here; closing this generator stops the
+    producer and closes `items`.
+    """
+    q = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+    end = object()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = q.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -1,6 +1,59 @@
 import os
+import json
 from typing import List, Tuple
 
+from core.fileio import clear_find_cache, find_upwards, write_json_atomic
+
+# Per-project settings, stored as <project>/.project.json
+SETTINGS_FILENAME = ".project.json"
+DEFAULT_SETTINGS = {
+    # "json": one <video_id>.json file per transcript
+    # "store": compressed append-only shards (see core.transcript_store)
+    "storage": "json",
+    # also write timed segments as <video_id>.seg (see core.segments)
+    "keep_segments": False,
+    # transcript language preference chain; "auto" takes any language the video has
+    "languages": ["id"],
+    # save every language of the chain the video has, not just the first match
+    "all_languages": False,
+}
+
+
+# Parsed .project.json files, keyed by path, with the (mtime_ns, size) they were read at
+_settings_cache: dict = {}
+
+
+def _read_settings(path: str) -> dict:
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            settings.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+def settings_for_path(path: str) -> dict:
+    """
+    Settings of the project that `path` (a file or directory inside it)
+    belongs to: the nearest ancestor holding a .project.json. Falls back to
+    the defaults.
+    """
+    directory = find_upwards(path, SETTINGS_FILENAME)
+    if directory is None:
+        return dict(DEFAULT_SETTINGS)
+    candidate = os.path.join(directory, SETTINGS_FILENAME)
+    try:
+        st = os.stat(candidate)
+    except OSError:
+        return dict(DEFAULT_SETTINGS)
+    # Re-read only when the file changed (called for every saved video)
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _settings_cache.get(candidate)
+    if cached is None or cached[0] != version:
+        cached = _settings_cache[candidate] = (version, _read_settings(candidate))
+    return dict(cached[1])
+
 class ProjectManager:
     """
     Handles creation and listing of projects and subprojects under a given root directory.
@@ -11,10 +64,13 @@ class ProjectManager:
         os.makedirs(self.output_root, exist_ok=True)
 
     def get_projects(self) -> List[str]:
-        """Return a sorted list of project names (subdirectories of output_root)."""
+        """
+        Return a sorted list of project names (subdirectories of output_root).
+        Hidden directories (.blobs and other internal state) are not projects.
+        """
         return sorted(
             name for name in os.listdir(self.output_root)
-            if os.path.isdir(os.path.join(self.output_root, name))
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.output_root, name))
         )
 
     def get_subprojects(self, project: str) -> List[str]:
@@ -24,7 +80,7 @@ class ProjectManager:
             return []
         return sorted(
             name for name in os.listdir(proj_dir)
-            if os.path.isdir(os.path.join(proj_dir, name))
+            if not name.startswith(".") and os.path.isdir(os.path.join(proj_dir, name))
         )
 
     def create_project(self, project: str) -> Tuple[bool, str]:
@@ -51,3 +107,18 @@ class ProjectManager:
             return True, f"Subproject '{subproject}' created under '{project}'."
         except Exception as e:
             return False, f"Failed to create subproject: {e}"
+
+    def get_settings(self, project: str) -> dict:
+        """Return a project's settings merged over the defaults."""
+        return _read_settings(os.path.join(self.output_root, project, SETTINGS_FILENAME))
+
+    def update_settings(self, project: str, **changes) -> dict:
+        """Update and persist a project's settings; returns the new settings."""
+        proj_dir = os.path.join(self.output_root, project)
+        if not os.path.isdir(proj_dir):
+            raise ValueError(f"Project '{project}' does not exist.")
+        settings = self.get_settings(project)
+        settings.update(changes)
+        write_json_atomic(os.path.join(proj_dir, SETTINGS_FILENAME), settings, indent=2)
+        clear_find_cache()
+        return settings
@@ -0,0 +1,198 @@
+# core/proxy_pool.py
+import os
+import time
+import random
+import socket
+import threading
+from http.cookiejar import MozillaCookieJar
+from typing import Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from youtube_transcript_api import YouTubeTranscriptApi
+
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.3
+# Tor refuses NEWNYM more often than this anyway
+MIN_ROTATE_INTERVAL = 10.0
+
+
+class ProxyEndpoint:
+    """
+    One upstream proxy (SOCKS or HTTP) with its own session/connection pool
+    and health stats.
+    """
+
+    def __init__(self, url: str, session: requests.Session,
+                 control_port: Optional[int] = None, control_password: str = ""):
+        self.url = url
+        self.session = session
+        self.api = YouTubeTranscriptApi(http_client=session)
+        self.control_port = control_port
+        self.control_password = control_password
+        self.requests = 0
+        self.errors = 0
+        self.blocks = 0
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.last_rotated = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.requests:
+            return 0.0
+        return (self.errors + self.blocks) / self.requests
+
+    def score(self) -> float:
+        """Lower is healthier: latency inflated by error rate and current load."""
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1 + 4 * self.error_rate) * (1 + self.in_flight)
+
+    def as_dict(self) -> dict:
+        return {
+            "proxy": self.url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "blocks": self.blocks,
+            "in_flight": self.in_flight,
+            "latency": round(self.latency, 3) if self.latency is not None else None
+        }
+
+
+def _make_session(proxy_url: str, cookie_file: Optional[str], pool_maxsize: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.proxies.update({"http": proxy_url, "https": proxy_url})
+    if cookie_file and os.path.exists(cookie_file):
+        try:
+            jar = MozillaCookieJar(cookie_file)
+            jar.load(ignore_discard=True, ignore_expires=True)
+            session.cookies = jar
+        except Exception as e:
+            print(f"Failed to load cookies for {proxy_url}: {e}")
+    return session
+
+
+def tor_newnym(control_port: int, password: str = "", host: str = "127.0.0.1",
+               timeout: float = 5.0) -> bool:
+    """Ask a Tor instance for a fresh circuit over its control port."""
+    try:
+        with socket.create_connection((host, control_port), timeout=timeout) as sock:
+            escaped = password.replace("\\", "\\\\").replace('"', '\\"')
+            sock.sendall(f'AUTHENTICATE "{escaped}"\r\nSIGNAL NEWNYM\r\nQUIT\r\n'.encode())
+            reply = b""
+            while True:
+                chunk = sock.recv(1024)
+                if not chunk:
+                    break
+                reply += chunk
+        lines = reply.decode(errors="replace").splitlines()
+        return len(lines) >= 2 and lines[0].startswith("250") and lines[1].startswith("250")
+    except OSError as e:
+        print(f"Tor control port {control_port} unavailable: {e}")
+        return False
+
+
+class ProxyPool:
+    """
+    Spreads requests over several proxies / Tor instances, preferring the
+    healthiest ones (lowest latency, error rate and load) while still
+    occasionally trying the others, and rotating Tor circuits on blocks.
+    """
+
+    def __init__(self, endpoints: List[ProxyEndpoint], explore: float = 0.1):
+        if not endpoints:
+            raise ValueError("ProxyPool needs at least one proxy")
+        self.endpoints = endpoints
+        self.explore = explore
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_urls(cls, proxy_urls: Iterable[str], cookie_file: Optional[str] = "cookies.txt",
+                  pool_maxsize: int = 8) -> "ProxyPool":
+        """Pool over arbitrary proxy URLs, e.g. "socks5h://10.0.0.2:1080" or "http://proxy:3128"."""
+        return cls([ProxyEndpoint(url, _make_session(url, cookie_file, pool_maxsize))
+                    for url in proxy_urls])
+
+    @classmethod
+    def from_tor_ports(cls, socks_ports: Iterable[int], control_ports: Optional[Iterable[int]] = None,
+                       control_password: str = "", host: str = "127.0.0.1",
+                       cookie_file: Optional[str] = "cookies.txt", pool_maxsize: int = 8) -> "ProxyPool":
+        """
+        Pool over several local Tor instances. Control ports default to
+        SocksPort + 1 (e.g. 9050/9051, 9052/9053, ...).
+        """
+        socks_ports = list(socks_ports)
+        control_ports = list(control_ports) if control_ports is not None else [p + 1 for p in socks_ports]
+        endpoints = []
+        for socks_port, control_port in zip(socks_ports, control_ports):
+            url = f"socks5h://{host}:{socks_port}"
+            endpoints.append(ProxyEndpoint(url, _make_session(url, cookie_file, pool_maxsize),
+                                           control_port, control_password))
+        return cls(endpoints)
+
+    @classmethod
+    def from_config(cls, tor_ports: Iterable[int] = (), proxy_urls: Iterable[str] = (),
+                    cookie_file: Optional[str] = "cookies.txt") -> Optional["ProxyPool"]:
+        """
+        Pool over local Tor instances and/or proxy URLs, either of which may
+        be empty. Returns None when both are.
+        """
+        tor_ports, proxy_urls = list(tor_ports), list(proxy_urls)
+        endpoints = []
+        if tor_ports:
+            endpoints += cls.from_tor_ports(tor_ports, cookie_file=cookie_file).endpoints
+        if proxy_urls:
+            endpoints += cls.from_urls(proxy_urls, cookie_file=cookie_file).endpoints
+        return cls(endpoints) if endpoints else None
+
+    def acquire(self) -> ProxyEndpoint:
+        """Pick an endpoint for the next request (call release() afterwards)."""
+        with self._lock:
+            if len(self.endpoints) > 1 and random.random() < self.explore:
+                endpoint = random.choice(self.endpoints)
+            else:
+                endpoint = min(self.endpoints, key=ProxyEndpoint.score)
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint: ProxyEndpoint, latency: float, outcome: str) -> None:
+        """
+        Record a finished request. `outcome` is "ok", "blocked" or "error";
+        a block triggers a circuit rotation when the endpoint is a Tor instance.
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            if outcome == "blocked":
+                endpoint.blocks += 1
+            elif outcome == "error":
+                endpoint.errors += 1
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * endpoint.latency
+        if outcome == "blocked":
+            self.rotate(endpoint)
+
+    def rotate(self, endpoint: ProxyEndpoint) -> bool:
+        """Request a new Tor circuit for `endpoint` and reset its health stats."""
+        if endpoint.control_port is None:
+            return False
+        with self._lock:
+            if time.monotonic() - endpoint.last_rotated < MIN_ROTATE_INTERVAL:
+                return False
+            endpoint.last_rotated = time.monotonic()
+        if not tor_newnym(endpoint.control_port, endpoint.control_password):
+            return False
+        with self._lock:
+            endpoint.requests = endpoint.errors = endpoint.blocks = 0
+            endpoint.latency = None
+        print(f"Rotated Tor circuit for {endpoint.url}")
+        return True
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [endpoint.as_dict() for endpoint in self.endpoints]
@@ -0,0 +1,103 @@
+# core/response_cache.py
+import os
+import json
+import time
+import zlib
+import sqlite3
+from typing import Optional, Sequence
+
+from core.db import connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    video_id    TEXT NOT NULL,
+    languages   TEXT NOT NULL,      -- requested language chain, e.g. "id,en,auto" (+"|all")
+    payload     BLOB NOT NULL,      -- zlib-compressed JSON [[language, segments], ...]
+    size        INTEGER NOT NULL,
+    fetched_at  REAL NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (video_id, languages)
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Cache of successful transcript fetches, keyed by video ID + requested
+    language chain, in `<output_root>/.responses.sqlite`. Entries expire
+    after `ttl` seconds; once the compressed payloads exceed `max_bytes`,
+    the least recently used ones are evicted.
+    """
+
+    FILENAME = ".responses.sqlite"
+
+    def __init__(self, output_root: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.output_root = output_root
+        self.db_path = os.path.join(output_root, self.FILENAME)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(output_root, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    @staticmethod
+    def key(languages: Sequence[str], all_languages: bool = False) -> str:
+        return ",".join(languages) + ("|all" if all_languages else "")
+
+    def get(self, video_id: str, languages: Sequence[str], all_languages: bool = False) -> Optional[tuple]:
+        """Return (results, fetched_at) for a live entry, or None."""
+        key = self.key(languages, all_languages)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload, fetched_at FROM responses WHERE video_id = ? AND languages = ?",
+                               (video_id, key)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl:
+                conn.execute("DELETE FROM responses WHERE video_id = ? AND languages = ?", (video_id, key))
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE video_id = ? AND languages = ?",
+                         (now, video_id, key))
+        results = [(code, segments) for code, segments in json.loads(zlib.decompress(row[0]))]
+        return results, row[1]
+
+    def put(self, video_id: str, languages: Sequence[str], results: list,
+            all_languages: bool = False) -> float:
+        """Store fetched (language, segments) results; returns their fetched_at timestamp."""
+        payload = zlib.compress(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                         (video_id, self.key(languages, all_languages), payload, len(payload), now, now))
+            self._evict(conn, now)
+        return now
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE fetched_at <= ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for video_id, languages, size in conn.execute(
+            "SELECT video_id, languages, size FROM responses ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append((video_id, languages))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE video_id = ? AND languages = ?", doomed)
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
@@ -0,0 +1,170 @@
+# core/scanner.py
+import os
+import re
+import json
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Matches the top-level key only: occurrences inside raw_content are escaped (\")
+TOKEN_COUNT_RE = re.compile(rb'(?<!\\)"token_count"\s*:\s*(-?\d+)')
+# "header" layout files keep their metadata before raw_content, within the first bytes
+HEAD_BYTES = 1024
+RAW_CONTENT_KEY = b'"raw_content"'
+# "legacy" layout files have token_count after raw_content, in the last few bytes
+TAIL_BYTES = 4096
+# Below this many files a process pool costs more than it saves
+MIN_PARALLEL_FILES = 256
+
+
+def iter_entries(folder: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    Walk `folder` once, skipping hidden files and directories (manifests,
+    indexes, caches), and yield (kind, path, stat) where kind is:
+      - "json":  a transcript JSON file (stat of the file)
+      - "store": a directory holding a TranscriptStore (stat of its index)
+    """
+    from core.transcript_store import TranscriptStore
+
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = sorted(os.scandir(current), key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.name == TranscriptStore.DIRNAME and entry.is_dir(follow_symlinks=False):
+                    index_path = os.path.join(entry.path, TranscriptStore.INDEX_NAME)
+                    if os.path.exists(index_path):
+                        yield "store", current, os.stat(index_path)
+                    continue
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(".json"):
+                    yield "json", entry.path, entry.stat()
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+
+def iter_json_files(folder: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Walk `folder` once and yield (full_path, stat) for every transcript JSON."""
+    for kind, path, st in iter_entries(folder):
+        if kind == "json":
+            yield path, st
+
+
+def read_header(path: str) -> dict:
+    """
+    Return the metadata stored before raw_content ("header" layout) with a
+    single small read. Legacy-layout or malformed files give an empty dict.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+        pos = head.find(RAW_CONTENT_KEY)
+        if pos <= 0:
+            return {}
+        prefix = head[:pos].rstrip()
+        if prefix.endswith(b","):
+            prefix = prefix[:-1]
+        return json.loads(prefix + b"}")
+    except (OSError, ValueError):
+        return {}
+
+
+def read_token_count(path: str) -> int:
+    """
+    Read a transcript's token_count without loading its raw_content: from
+    the header if the file has one, else from the tail of the file, and
+    only then with a full parse. Malformed files count as zero tokens.
+    """
+    header = read_header(path)
+    if "token_count" in header:
+        try:
+            return int(header["token_count"])
+        except (TypeError, ValueError):
+            return 0
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - TAIL_BYTES))
+            tail = f.read()
+        matches = TOKEN_COUNT_RE.findall(tail)
+        if matches:
+            return int(matches[-1])
+        with open(path, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("token_count", 0))
+    except Exception:
+        return 0
+
+
+def read_token_counts(paths: Sequence[str], workers: Optional[int] = None,
+                      pool: Optional["ProcessPoolExecutor"] = None) -> List[int]:
+    """
+    read_token_count() for many files, in order. With workers > 1 (or an
+    existing `pool`) and enough files the reads are spread over processes.
+    """
+    if len(paths) < MIN_PARALLEL_FILES or (pool is None and not (workers and workers > 1)):
+        return [read_token_count(p) for p in paths]
+    if pool is not None:
+        return list(pool.map(read_token_count, paths, chunksize=64))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as own_pool:
+        return list(own_pool.map(read_token_count, paths, chunksize=64))
+
+
+def scan_tree(folder: str, workers: Optional[int] = None) -> Iterator[dict]:
+    """
+    Single pass over `folder` yielding one record per transcript:
+    {"path": <relative to folder>, "size", "mtime_ns", "token_count"}.
+    Transcripts kept in a TranscriptStore are reported from its index as
+    "<dir>/.store/<video_id>" with their compressed size.
+    Files are read in batches so memory stays bounded on large trees.
+    """
+    from core.transcript_store import TranscriptStore
+
+    pool = None
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        batch = []
+        for kind, path, st in iter_entries(folder):
+            if kind == "store":
+                store_rel = os.path.relpath(os.path.join(path, TranscriptStore.DIRNAME), folder)
+                for video_id, length, token_count, _ in TranscriptStore.open(path).iter_metadata():
+                    yield {
+                        "path": os.path.join(store_rel, video_id),
+                        "size": length,
+                        "mtime_ns": st.st_mtime_ns,
+                        "token_count": token_count
+                    }
+                continue
+            batch.append((path, st))
+            if len(batch) >= MIN_PARALLEL_FILES * 4:
+                yield from _records(folder, batch, pool)
+                batch = []
+        if batch:
+            yield from _records(folder, batch, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def _records(folder: str, batch: list, pool: Optional["ProcessPoolExecutor"]) -> Iterator[dict]:
+    counts = read_token_counts([full for full, _ in batch], pool=pool)
+    for (full, st), count in zip(batch, counts):
+        yield {
+            "path": os.path.relpath(full, folder),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "token_count": count
+        }
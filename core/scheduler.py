@@ -0,0 +1,151 @@
+# core/scheduler.py
+import time
+import random
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from core.metrics import get_metrics
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average
+    with bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> bool:
+        """Block until a token is available. Returns False if `stop` was set meanwhile."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last `window` requests and opens (pausing all
+    callers of wait()) for `cooldown` seconds once the share of blocked
+    requests reaches `threshold`. Each consecutive trip doubles the cooldown,
+    up to `max_cooldown`; a clean request after reopening resets it.
+    """
+
+    def __init__(self, threshold: float = 0.3, window: int = 20, min_samples: int = 5,
+                 cooldown: float = 60.0, max_cooldown: float = 900.0):
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def block_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return sum(self._outcomes) / len(self._outcomes)
+
+    def record(self, blocked: bool) -> None:
+        with self._lock:
+            self._outcomes.append(1 if blocked else 0)
+            if not blocked:
+                self._cooldown = self.base_cooldown
+                return
+            samples = len(self._outcomes)
+            if samples >= self.min_samples and sum(self._outcomes) / samples >= self.threshold:
+                self._open_until = time.monotonic() + self._cooldown
+                print(f"Block rate {sum(self._outcomes)}/{samples}, pausing requests for {self._cooldown:.0f}s")
+                get_metrics().inc("circuit_breaker_trips_total")
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                # Start counting afresh once the pause is over
+                self._outcomes.clear()
+
+    def wait(self, stop: Optional[threading.Event] = None) -> bool:
+        """Block while the breaker is open. Returns False if `stop` was set meanwhile."""
+        while True:
+            remaining = self._open_until - time.monotonic()
+            if remaining <= 0:
+                return True
+            if stop is not None:
+                if stop.wait(remaining):
+                    return False
+            else:
+                time.sleep(remaining)
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 120.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RequestScheduler:
+    """
+    Paces fetches shared by all workers: a token-bucket rate limit, a circuit
+    breaker that pauses everything when the block rate climbs, and a
+    per-video retry budget with exponential backoff + jitter for blocked
+    requests. Several schedulers can share one `bucket` and `breaker` to pace
+    independent runs together while each keeps its own stop().
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 4, max_retries: int = 3,
+                 backoff_base: float = 2.0, backoff_cap: float = 120.0,
+                 breaker: Optional[CircuitBreaker] = None, bucket: Optional[TokenBucket] = None):
+        self.bucket = bucket or TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stop_event = threading.Event()
+
+    def stop(self) -> None:
+        """Wake up and abort every caller waiting on the scheduler."""
+        self.stop_event.set()
+
+    def execute(self, call: Callable, is_blocked: Callable[[object], bool]):
+        """
+        Run `call()` under the rate limit, retrying it while
+        `is_blocked(result)` is true and the retry budget lasts.
+        Returns the last result (None if the scheduler was stopped first).
+        """
+        result = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.wait(self.stop_event) or not self.bucket.acquire(self.stop_event):
+                return result
+            result = call()
+            blocked = is_blocked(result)
+            self.breaker.record(blocked)
+            get_metrics().set("circuit_breaker_block_rate", self.breaker.block_rate())
+            if not blocked:
+                return result
+            if attempt < self.max_retries:
+                get_metrics().inc("scheduler_retries_total")
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                if self.stop_event.wait(delay):
+                    return result
+        return result
@@ -0,0 +1,186 @@
+# core/search_index.py
+import os
+import sqlite3
+from typing import List, Optional
+
+from core.db import connect
+from core.fileio import clear_find_cache, find_upwards, shared_instance
+from core.scanner import iter_entries
+from core.segments import load_segments, segments_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path        TEXT PRIMARY KEY,   -- relative to output_root, '/'-separated
+    video_id    TEXT NOT NULL,
+    url         TEXT,
+    version     TEXT NOT NULL       -- "mtime_ns:size" for JSON files, "shard:offset" for store records
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    raw_content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+STORE_MARKER = "/.store/"
+# Matching segments looked up per result
+MAX_TIMESTAMPS = 5
+FTS_OPERATORS = ("AND", "OR", "NOT", "NEAR")
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 full-text index over every transcript under output_root,
+    kept in `<output_root>/.search.sqlite`. save_output() indexes each
+    transcript as it is written, for both storage backends; refresh() picks
+    up files added, changed or deleted behind its back.
+    """
+
+    FILENAME = ".search.sqlite"
+
+    def __init__(self, output_root: str):
+        self.output_root = output_root
+        self.db_path = os.path.join(output_root, self.FILENAME)
+        os.makedirs(output_root, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        clear_find_cache()
+
+    @classmethod
+    def for_path(cls, path: str) -> Optional["SearchIndex"]:
+        """Return the index of the nearest ancestor of `path` that has one, if any."""
+        root = find_upwards(os.path.dirname(os.path.abspath(path)), cls.FILENAME)
+        return shared_instance(cls, root) if root is not None else None
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _rel(self, full_path: str) -> str:
+        return os.path.relpath(full_path, self.output_root).replace(os.sep, "/")
+
+    def _prefix(self, folder: Optional[str]) -> str:
+        if not folder:
+            return ""
+        rel = self._rel(folder)
+        return "" if rel == "." else rel + "/"
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, rel: str, video_id: str, url: Optional[str],
+                version: str, raw_content: str) -> None:
+        row = conn.execute("SELECT rowid FROM docs WHERE path = ?", (rel,)).fetchone()
+        if row:
+            conn.execute("UPDATE docs SET url = ?, version = ? WHERE rowid = ?", (url, version, row[0]))
+            conn.execute("UPDATE docs_fts SET raw_content = ? WHERE rowid = ?", (raw_content, row[0]))
+        else:
+            cur = conn.execute("INSERT INTO docs (path, video_id, url, version) VALUES (?, ?, ?, ?)",
+                               (rel, video_id, url, version))
+            conn.execute("INSERT INTO docs_fts (rowid, raw_content) VALUES (?, ?)",
+                         (cur.lastrowid, raw_content))
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, rel: str) -> None:
+        row = conn.execute("SELECT rowid FROM docs WHERE path = ?", (rel,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+
+    def add_file(self, path: str, video_id: str, data: dict) -> None:
+        """Index (or re-index) a transcript just written to the JSON file `path`."""
+        st = os.stat(path)
+        with self._connect() as conn:
+            self._upsert(conn, self._rel(path), video_id, data.get("url"),
+                         f"{st.st_mtime_ns}:{st.st_size}", data.get("raw_content", ""))
+
+    def add_record(self, directory: str, video_id: str, data: dict, shard: str, offset: int) -> None:
+        """Index (or re-index) a transcript just appended to the TranscriptStore in `directory`."""
+        rel = self._rel(directory) + STORE_MARKER + video_id
+        with self._connect() as conn:
+            self._upsert(conn, rel, video_id, data.get("url"), f"{shard}:{offset}",
+                         data.get("raw_content", ""))
+
+    def refresh(self, folder: Optional[str] = None) -> int:
+        """
+        Bring the index in line with the transcripts under `folder` (default:
+        all of output_root). Only new or changed transcripts are read; ones
+        that disappeared are dropped. Returns the number (re)indexed.
+        """
+        import json
+        from core.transcript_store import TranscriptStore
+
+        prefix = self._prefix(folder)
+        updated = 0
+        with self._connect() as conn:
+            known = dict(conn.execute(
+                "SELECT path, version FROM docs WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ))
+            for kind, path, st in iter_entries(folder or self.output_root):
+                if kind == "store":
+                    store = TranscriptStore.open(path)
+                    marker = self._rel(path) + STORE_MARKER
+                    for video_id, shard, offset, _ in store.iter_locations():
+                        rel, version = marker + video_id, f"{shard}:{offset}"
+                        if known.pop(rel, None) == version:
+                            continue
+                        data = store.get(video_id) or {}
+                        self._upsert(conn, rel, video_id, data.get("url"), version,
+                                     data.get("raw_content", ""))
+                        updated += 1
+                    continue
+                rel, version = self._rel(path), f"{st.st_mtime_ns}:{st.st_size}"
+                if known.pop(rel, None) == version:
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                video_id = os.path.splitext(os.path.basename(path))[0]
+                self._upsert(conn, rel, video_id, data.get("url"), version, data.get("raw_content", ""))
+                updated += 1
+            for rel in known:
+                self._delete(conn, rel)
+        return updated
+
+    def search(self, query: str, folder: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """
+        Run an FTS5 query (words, "exact phrases", AND/OR/NOT, prefix*) over
+        the transcripts under `folder` (default: everything), best matches
+        first. Each result has path, video_id, url, a highlighted snippet and
+        `timestamps`: start times (seconds) of matching segments when the
+        video's timing was kept in a .seg file, else an empty list.
+        """
+        prefix = self._prefix(folder)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT d.path, d.video_id, d.url, snippet(docs_fts, 0, '**', '**', '…', 16) "
+                "FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid "
+                "WHERE docs_fts MATCH ? AND substr(d.path, 1, ?) = ? "
+                "ORDER BY bm25(docs_fts) LIMIT ?",
+                (query, len(prefix), prefix, limit)
+            ).fetchall()
+        terms = [t for t in (w.strip('"*()') for w in query.split())
+                 if t and t not in FTS_OPERATORS]
+        return [
+            {"path": path, "video_id": video_id, "url": url, "snippet": snippet,
+             "timestamps": self._timestamps(path, video_id, terms)}
+            for path, video_id, url, snippet in rows
+        ]
+
+    def _timestamps(self, rel: str, video_id: str, terms: List[str]) -> List[float]:
+        directory = rel.split(STORE_MARKER)[0] if STORE_MARKER in rel else rel.rpartition("/")[0]
+        path = segments_path(os.path.join(self.output_root, *directory.split("/")), video_id)
+        if not terms or not os.path.exists(path):
+            return []
+        try:
+            with load_segments(path) as table:
+                starts = {seg["start"] for term in terms for seg in table.find(term, MAX_TIMESTAMPS)}
+        except (OSError, ValueError):
+            return []
+        return sorted(starts)[:MAX_TIMESTAMPS]
+
+
+def search(output_root: str, query: str, folder: Optional[str] = None, limit: int = 20,
+           refresh: bool = False) -> List[dict]:
+    """Search the transcripts under `output_root`; see SearchIndex.search()."""
+    index = SearchIndex(output_root)
+    if refresh:
+        index.refresh(folder)
+    return index.search(query, folder, limit)
@@ -0,0 +1,148 @@
+# core/segments.py
+import os
+import sys
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, Optional
+
+from core.fileio import write_bytes_atomic
+
+# Layout of a .seg file (all little-endian, every section 8-byte aligned):
+#   header   MAGIC (8 bytes), segment count n (u64), text buffer size (u64)
+#   start    n x float64
+#   duration n x float64
+#   offsets  (n + 1) x uint64   - text of segment i is text[offsets[i]:offsets[i+1]]
+#   text     UTF-8 bytes of all segment texts, concatenated
+MAGIC = b"TSEG\x01\x00\x00\x00"
+HEADER = struct.Struct("<8sQQ")
+SUFFIX = ".seg"
+
+
+def segments_path(output_dir: str, video_id: str) -> str:
+    return os.path.join(output_dir, f"{video_id}{SUFFIX}")
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def save_segments(path: str, segments: Iterable[dict]) -> str:
+    """Write segments ({"text", "start", "duration"} dicts) in the columnar .seg format."""
+    starts, durations, offsets = array("d"), array("d"), array("Q", [0])
+    text = bytearray()
+    for seg in segments:
+        starts.append(float(seg.get("start", 0)))
+        durations.append(float(seg.get("duration", 0)))
+        text += seg.get("text", "").encode("utf-8")
+        offsets.append(len(text))
+    payload = b"".join([
+        HEADER.pack(MAGIC, len(starts), len(text)),
+        _le_bytes(starts), _le_bytes(durations), _le_bytes(offsets),
+        bytes(text)
+    ])
+    write_bytes_atomic(path, payload)
+    return path
+
+
+class SegmentTable:
+    """
+    Memory-mapped, read-only view of a .seg file. Start/duration/offset
+    columns are exposed as zero-copy memoryviews; texts are decoded lazily.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        buf = self._buf = memoryview(self._map) if self._map is not None else memoryview(b"")
+        magic, n, text_len = HEADER.unpack_from(buf, 0) if len(buf) >= HEADER.size else (None, 0, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a segment file")
+        self.count = n
+        pos = HEADER.size
+        self.starts = self._column(buf, pos, n, "d")
+        pos += 8 * n
+        self.durations = self._column(buf, pos, n, "d")
+        pos += 8 * n
+        self.offsets = self._column(buf, pos, n + 1, "Q")
+        pos += 8 * (n + 1)
+        self.text_buffer = buf[pos:pos + text_len]
+
+    @staticmethod
+    def _column(buf: memoryview, pos: int, n: int, typecode: str):
+        view = buf[pos:pos + 8 * n]
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text(self, i: int) -> str:
+        return bytes(self.text_buffer[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i: int) -> dict:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return {"text": self.text(i), "start": self.starts[i], "duration": self.durations[i]}
+
+    def index_at(self, t: float) -> int:
+        """Index of the segment playing at time `t` (the last one starting at or before it)."""
+        return max(0, bisect_right(self.starts, t) - 1)
+
+    def clip(self, start: float, end: float) -> List[dict]:
+        """Segments overlapping [start, end) seconds."""
+        out = []
+        for i in range(self.index_at(start), self.count):
+            if self.starts[i] >= end:
+                break
+            if self.starts[i] + self.durations[i] > start:
+                out.append(self[i])
+        return out
+
+    def find(self, term: str, limit: Optional[int] = None) -> List[dict]:
+        """
+        Segments whose text contains `term` (ASCII case-insensitive), found by
+        scanning the text buffer rather than decoding every segment.
+        """
+        needle = term.lower().encode("utf-8")
+        haystack = bytes(self.text_buffer).lower()
+        hits, last, pos = [], -1, haystack.find(needle)
+        while pos != -1 and (limit is None or len(hits) < limit):
+            i = bisect_right(self.offsets, pos) - 1
+            # Skip matches spanning two segments' concatenated texts
+            if i != last and pos + len(needle) <= self.offsets[i + 1]:
+                hits.append(self[i])
+                last = i
+            pos = haystack.find(needle, pos + 1)
+        return hits
+
+    def close(self) -> None:
+        # Views must be released before the mmap can be closed
+        for name in ("starts", "durations", "offsets", "text_buffer", "_buf"):
+            value = getattr(self, name, None)
+            if isinstance(value, memoryview):
+                value.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "SegmentTable":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_segments(path: str) -> SegmentTable:
+    """Memory-map a .seg file written by save_segments."""
+    return SegmentTable(path)
@@ -0,0 +1,214 @@
+# core/stats_index.py
+import os
+import sqlite3
+from typing import List, Optional
+
+from core.db import connect
+from core.fileio import clear_find_cache, find_upwards, shared_instance
+from core.scanner import iter_entries, read_token_counts
+from core.transcript_store import TranscriptStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path        TEXT PRIMARY KEY,   -- relative to output_root, '/'-separated
+    project     TEXT NOT NULL,
+    subproject  TEXT,               -- NULL for files directly under a project
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    token_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_project ON files (project, subproject);
+-- TranscriptStore directories, keyed by the mtime/size of their index; their
+-- records live in `files` as '<dir>/.store/<video_id>'
+CREATE TABLE IF NOT EXISTS stores (
+    path        TEXT PRIMARY KEY,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL
+);
+"""
+STORE_MARKER = "/.store/"
+
+
+class StatsIndex:
+    """
+    Persistent per-file stats for every transcript JSON under output_root,
+    stored in `<output_root>/.stats.sqlite` and keyed by path + mtime + size.
+
+    refresh() only stats the tree and re-parses files that changed since the
+    last run; save_output() records new files as they are written, so the
+    dashboards never have to load every transcript on each rerun.
+    """
+
+    FILENAME = ".stats.sqlite"
+
+    def __init__(self, output_root: str):
+        self.output_root = output_root
+        self.db_path = os.path.join(output_root, self.FILENAME)
+        os.makedirs(output_root, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        clear_find_cache()
+
+    @classmethod
+    def for_path(cls, path: str) -> Optional["StatsIndex"]:
+        """Return the index of the nearest ancestor of `path` that has one, if any."""
+        root = find_upwards(os.path.dirname(os.path.abspath(path)), cls.FILENAME)
+        return shared_instance(cls, root) if root is not None else None
+
+    def _connect(self):
+        # Opened per call so the index can be used from the fetch worker threads
+        return connect(self.db_path)
+
+    def _rel(self, full_path: str) -> str:
+        return os.path.relpath(full_path, self.output_root).replace(os.sep, "/")
+
+    def _prefix(self, folder: str) -> str:
+        rel = self._rel(folder)
+        return "" if rel == "." else rel + "/"
+
+    @staticmethod
+    def _split(rel: str) -> tuple:
+        parts = rel.split("/")
+        project = parts[0]
+        subproject = parts[1] if len(parts) > 2 and not parts[1].startswith(".") else None
+        return project, subproject
+
+    def record(self, full_path: str, token_count: int) -> None:
+        """Insert or update a single file's entry (called right after it is written)."""
+        st = os.stat(full_path)
+        rel = self._rel(full_path)
+        project, subproject = self._split(rel)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (rel, project, subproject, st.st_mtime_ns, st.st_size, int(token_count))
+            )
+
+    def record_store(self, directory: str, video_id: str, length: int, token_count: int) -> None:
+        """Insert or update the entry of a record just appended to `directory`'s TranscriptStore."""
+        st = os.stat(os.path.join(directory, TranscriptStore.DIRNAME, TranscriptStore.INDEX_NAME))
+        path = self._rel(directory) + STORE_MARKER + video_id
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (path, *self._split(path), st.st_mtime_ns, length, int(token_count))
+            )
+
+    def refresh(self, folder: Optional[str] = None, workers: Optional[int] = None) -> int:
+        """
+        Bring the index in sync with the files on disk under `folder`
+        (defaults to the whole output_root). Only files whose mtime/size
+        changed are read, optionally over `workers` processes.
+        TranscriptStore directories are reloaded from their index when it
+        changed. Returns the number of files and stores re-read.
+        """
+        folder = folder or self.output_root
+        prefix = self._prefix(folder)
+        # A store directly inside `folder` is keyed by the folder itself
+        own = prefix[:-1]
+
+        with self._connect() as conn:
+            known = {
+                path: (mtime_ns, size)
+                for path, mtime_ns, size in conn.execute(
+                    "SELECT path, mtime_ns, size FROM files "
+                    "WHERE substr(path, 1, ?) = ? AND instr(path, ?) = 0",
+                    (len(prefix), prefix, STORE_MARKER)
+                )
+            }
+            known_stores = {
+                path: (mtime_ns, size)
+                for path, mtime_ns, size in conn.execute(
+                    "SELECT path, mtime_ns, size FROM stores WHERE substr(path, 1, ?) = ? OR path = ?",
+                    (len(prefix), prefix, own)
+                )
+            }
+            changed = []
+            changed_stores = []
+            for kind, full, st in iter_entries(folder):
+                rel = self._rel(full)
+                if kind == "store":
+                    if rel != "." and known_stores.pop(rel, None) != (st.st_mtime_ns, st.st_size):
+                        changed_stores.append((full, rel, st))
+                    continue
+                if rel.count("/") == 0:
+                    # files directly under output_root belong to no project
+                    continue
+                if known.pop(rel, None) != (st.st_mtime_ns, st.st_size):
+                    changed.append((full, rel, st))
+
+            counts = read_token_counts([full for full, _, _ in changed], workers)
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                [(rel, *self._split(rel), st.st_mtime_ns, st.st_size, count)
+                 for (_, rel, st), count in zip(changed, counts)]
+            )
+            # Whatever is left in `known` no longer exists on disk
+            conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in known])
+
+            # Stores are reloaded wholesale from their own index when it changed
+            for rel in known_stores:
+                self._drop_store(conn, rel)
+            for full, rel, st in changed_stores:
+                self._drop_store(conn, rel)
+                rows = []
+                for video_id, length, token_count, _ in TranscriptStore.open(full).iter_metadata():
+                    path = rel + STORE_MARKER + video_id
+                    rows.append((path, *self._split(path), st.st_mtime_ns, length, token_count))
+                conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT INTO stores VALUES (?, ?, ?)", (rel, st.st_mtime_ns, st.st_size))
+        return len(changed) + len(changed_stores)
+
+    @staticmethod
+    def _drop_store(conn: sqlite3.Connection, rel: str) -> None:
+        marker = rel + STORE_MARKER
+        conn.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(marker), marker))
+        conn.execute("DELETE FROM stores WHERE path = ?", (rel,))
+
+    def project_stats(self) -> List[list]:
+        """[project, total_files, total_tokens, total_bytes] for every project directory."""
+        with self._connect() as conn:
+            totals = {
+                project: [files, tokens, size]
+                for project, files, tokens, size in conn.execute(
+                    "SELECT project, COUNT(*), SUM(token_count), SUM(size) "
+                    "FROM files GROUP BY project"
+                )
+            }
+        stats = []
+        for project in sorted(os.listdir(self.output_root)):
+            if project.startswith(".") or not os.path.isdir(os.path.join(self.output_root, project)):
+                continue
+            stats.append([project] + totals.get(project, [0, 0, 0]))
+        return stats
+
+    def subproject_stats(self) -> List[list]:
+        """[project, subproject, total_files, total_tokens, total_bytes] for every subproject directory."""
+        with self._connect() as conn:
+            totals = {
+                (project, sub): [files, tokens, size]
+                for project, sub, files, tokens, size in conn.execute(
+                    "SELECT project, subproject, COUNT(*), SUM(token_count), SUM(size) "
+                    "FROM files WHERE subproject IS NOT NULL GROUP BY project, subproject"
+                )
+            }
+        stats = []
+        for project in sorted(os.listdir(self.output_root)):
+            proj_path = os.path.join(self.output_root, project)
+            if project.startswith(".") or not os.path.isdir(proj_path):
+                continue
+            for sub in sorted(os.listdir(proj_path)):
+                if sub.startswith(".") or not os.path.isdir(os.path.join(proj_path, sub)):
+                    continue
+                stats.append([project, sub] + totals.get((project, sub), [0, 0, 0]))
+        return stats
+
+    def file_tokens(self, folder: str) -> List[tuple]:
+        """(path relative to `folder`, token_count) for every indexed file under `folder`."""
+        prefix = self._prefix(folder)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT path, token_count FROM files WHERE substr(path, 1, ?) = ? ORDER BY path",
+                (len(prefix), prefix)
+            ).fetchall()
+        return [(os.path.join(*path[len(prefix):].split("/")), tokens) for path, tokens in rows]
@@ -1,7 +1,297 @@
 # core/token_estimator.py
 import os
+import re
 import csv
 import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from core.fileio import write_json_atomic
+from core.scanner import iter_entries, scan_tree
+from core.stats_index import StatsIndex
+
+# Approximation of the cl100k pre-tokenizer: contractions, letter runs (with one
+# leading non-letter), 1-3 digit groups, punctuation runs and whitespace.
+PRETOKENIZE_RE = re.compile(
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+# Average characters per BPE token inside a word for the heuristic backend
+CHARS_PER_TOKEN = 4
+# TranscriptStore records recounted per batch by recount_tree
+STORE_BATCH = 1024
+
+
+class HeuristicTokenizer:
+    """
+    Dependency-free estimate: splits text the way BPE tokenizers pre-tokenize
+    it, then charges each word ~1 token per CHARS_PER_TOKEN characters and
+    each number group / punctuation run / line break one token. Tracks real
+    tokenizers much more closely than len(text) // 4 on punctuation- and
+    affix-heavy text such as Indonesian transcripts.
+    """
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        total = 0
+        for piece in PRETOKENIZE_RE.findall(text):
+            stripped = piece.strip(" ")
+            if not stripped:
+                continue
+            if stripped.isspace():
+                total += 1
+            elif stripped[-1].isalpha():
+                total += max(1, -(-len(stripped) // CHARS_PER_TOKEN))
+            else:
+                total += 1
+        return total
+
+
+class BPETokenizer:
+    """
+    Byte-level BPE token counter backed by a local vocabulary file in the
+    tiktoken format (one "<base64 token> <rank>" pair per line, e.g.
+    cl100k_base.tiktoken). Nothing is downloaded.
+    """
+
+    def __init__(self, vocab_file: str, piece_cache_size: int = 50_000):
+        self.vocab_file = vocab_file
+        self.name = f"bpe:{os.path.basename(vocab_file)}"
+        self.ranks = {}
+        with open(vocab_file, "rb") as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    self.ranks[base64.b64decode(token)] = int(rank)
+        self.piece_cache_size = piece_cache_size
+        self._piece_cache = {}
+
+    def __getstate__(self):
+        # Pickled into worker processes: ship the vocabulary, not the cache
+        state = self.__dict__.copy()
+        state["_piece_cache"] = {}
+        return state
+
+    def _count_piece(self, piece: bytes) -> int:
+        if piece in self.ranks:
+            return 1
+        cached = self._piece_cache.get(piece)
+        if cached is not None:
+            return cached
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        while len(parts) > 1:
+            best, best_rank = None, None
+            for i in range(len(parts) - 1):
+                rank = self.ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best, best_rank = i, rank
+            if best is None:
+                break
+            parts[best:best + 2] = [parts[best] + parts[best + 1]]
+        if len(self._piece_cache) >= self.piece_cache_size:
+            self._piece_cache.clear()
+        self._piece_cache[piece] = len(parts)
+        return len(parts)
+
+    def count(self, text: str) -> int:
+        return sum(self._count_piece(piece.encode("utf-8")) for piece in PRETOKENIZE_RE.findall(text))
+
+
+class TokenCounter:
+    """
+    Memoizing, batch front-end for a tokenizer backend. Counts are cached by
+    content hash, so re-counting identical transcripts is free.
+    """
+
+    def __init__(self, tokenizer=None, cache_size: int = 100_000):
+        self.tokenizer = tokenizer or HeuristicTokenizer()
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _lookup(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+            return count
+
+    def _store(self, key: bytes, count: int) -> None:
+        with self._lock:
+            self._cache[key] = count
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        key = self._key(text)
+        count = self._lookup(key)
+        if count is None:
+            count = self.tokenizer.count(text)
+            self._store(key, count)
+        return count
+
+    def count_batch(self, texts: Iterable[str], workers: Optional[int] = None) -> List[int]:
+        """
+        Count many texts at once. Duplicates and cached texts are only
+        tokenized once; the rest are spread over `workers` processes if given.
+        """
+        texts = list(texts)
+        keys = [self._key(t) for t in texts]
+        counts = {k: c for k in set(keys) if (c := self._lookup(k)) is not None}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in counts:
+                missing.setdefault(key, text)
+        if missing:
+            if workers and workers > 1 and len(missing) > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(self.tokenizer,)) as pool:
+                    results = pool.map(_count_in_worker, missing.values(), chunksize=16)
+                    fresh = dict(zip(missing.keys(), results))
+            else:
+                fresh = {k: self.tokenizer.count(t) for k, t in missing.items()}
+            for key, count in fresh.items():
+                self._store(key, count)
+            counts.update(fresh)
+        return [counts[k] for k in keys]
+
+    def recount_tree(self, folder: str, workers: Optional[int] = None) -> tuple:
+        """
+        Recompute token_count for every transcript under `folder` with this
+        counter's tokenizer. JSON files are rewritten only if their count
+        changed (key order, and so the on-disk layout, is preserved);
+        TranscriptStore records whose count changed are saved again, which
+        appends the updated record and repoints the store's index.
+        Returns (transcripts_scanned, transcripts_updated, total_tokens).
+        """
+        paths, stores = [], []
+        for kind, path, _ in iter_entries(folder):
+            (stores if kind == "store" else paths).append(path)
+        pool = None
+        if workers and workers > 1 and (len(paths) > 1 or stores):
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(self.tokenizer,))
+        try:
+            if pool is not None:
+                results = list(pool.map(_recount_file, paths, chunksize=16))
+            else:
+                results = [_recount_file(p, self) for p in paths]
+
+            index = StatsIndex.for_path(os.path.join(folder, "tokens.csv"))
+            scanned = len(paths)
+            updated = 0
+            total = 0
+            for path, count, changed in results:
+                total += count
+                if changed:
+                    updated += 1
+                    if index is not None:
+                        index.record(path, count)
+            for directory in stores:
+                store_scanned, store_updated, store_total = self._recount_store(directory, pool, index)
+                scanned += store_scanned
+                updated += store_updated
+                total += store_total
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return scanned, updated, total
+
+    def _recount_store(self, directory: str, pool, index: Optional[StatsIndex]) -> tuple:
+        from core.transcript_store import TranscriptStore
+
+        store = TranscriptStore.open(directory)
+        scanned = updated = total = 0
+        batch = []
+
+        def flush() -> None:
+            nonlocal updated, total
+            texts = [record.get("raw_content") or "" for record in batch]
+            if pool is not None:
+                counts = list(pool.map(_count_in_worker, texts, chunksize=16))
+            else:
+                counts = [self.count(text) for text in texts]
+            for record, count in zip(batch, counts):
+                total += count
+                if record.get("token_count") == count:
+                    continue
+                record["token_count"] = count
+                video_id = record.pop("video_id")
+                store.put(video_id, record)
+                updated += 1
+                location = store.locate(video_id) if index is not None else None
+                if location is not None:
+                    index.record_store(directory, video_id, location[2], count)
+            batch.clear()
+
+        # Records are recounted in batches so memory stays bounded
+        for record in store.iter_records():
+            scanned += 1
+            batch.append(record)
+            if len(batch) >= STORE_BATCH:
+                flush()
+        if batch:
+            flush()
+        return scanned, updated, total
+
+
+# Per-process counter used by the pool workers above
+_worker_counter: Optional[TokenCounter] = None
+
+
+def _init_worker(tokenizer) -> None:
+    global _worker_counter
+    _worker_counter = TokenCounter(tokenizer)
+
+
+def _count_in_worker(text: str) -> int:
+    return _worker_counter.count(text)
+
+
+def _recount_file(path: str, counter: Optional[TokenCounter] = None) -> tuple:
+    counter = counter or _worker_counter
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return path, 0, False
+    count = counter.count(data.get("raw_content", ""))
+    if data.get("token_count") == count:
+        return path, count, False
+    data["token_count"] = count
+    write_json_atomic(path, data, ensure_ascii=False, indent=2)
+    return path, count, True
+
+
+# Process-wide counter used by format_output
+_default_counter = TokenCounter()
+
+
+def set_tokenizer(tokenizer=None) -> TokenCounter:
+    """Switch the default tokenizer backend (None restores the heuristic)."""
+    global _default_counter
+    _default_counter = TokenCounter(tokenizer)
+    return _default_counter
+
+
+def get_token_counter() -> TokenCounter:
+    return _default_counter
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text` with the default (memoized) tokenizer."""
+    return _default_counter.count(text)
+
 
 class TokenEstimator:
     """
@@ -18,30 +308,38 @@ class TokenEstimator:
         os.makedirs(self.tokens_dir, exist_ok=True)
         self.csv_path = os.path.join(self.tokens_dir, "tokens.csv")
 
-    def generate_csv(self):
+    def generate_csv(self, workers: int | None = None):
         """
         Scans all .json files under self.target_folder (recursively),
         writes a CSV with columns [relative_path, token_count],
         and appends a ['TOTAL', total_tokens] row at the end.
+        `workers` spreads token_count reads over a process pool on large trees.
         """
+        index = StatsIndex.for_path(os.path.join(self.target_folder, "tokens.csv"))
+        if index is not None:
+            # Served from the output root's stats index, synced for this folder only
+            index.refresh(self.target_folder, workers=workers)
+            rows = [list(row) for row in index.file_tokens(self.target_folder)]
+            total = sum(cnt for _, cnt in rows)
+            return self._write_csv(rows, total)
+
         rows = []
         total = 0
+        for record in scan_tree(self.target_folder, workers):
+            rows.append([record["path"], record["token_count"]])
+            total += record["token_count"]
+
+        return self._write_csv(rows, total)
+
+    def recount(self, workers: int | None = None) -> tuple:
+        """
+        Recompute token_count of every transcript (JSON files and store
+        records) under self.target_folder with the default tokenizer.
+        Returns (transcripts_scanned, transcripts_updated, total_tokens).
+        """
+        return get_token_counter().recount_tree(self.target_folder, workers)
 
-        for root, _, files in os.walk(self.target_folder):
-            for fn in sorted(files):
-                if fn.endswith(".json"):
-                    full = os.path.join(root, fn)
-                    rel = os.path.relpath(full, self.target_folder)
-                    try:
-                        with open(full, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                            cnt = int(data.get("token_count", 0))
-                    except Exception:
-                        cnt = 0
-                    rows.append([rel, cnt])
-                    total += cnt
-
-        # Write CSV
+    def _write_csv(self, rows, total):
         with open(self.csv_path, "w", newline="", encoding="utf-8") as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(["file", "token_count"])
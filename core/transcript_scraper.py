@@ -1,19 +1,40 @@
+# Importing this module is cheap and does no I/O: requests, pytube,
+# youtube_transcript_api and ElementTree are imported where they are used,
+# and the shared HTTP client is only built on first use (see shared_client).
+from __future__ import annotations
+
 import os
 import ssl
-from pytube import Playlist
 import re
 import json
-import requests
-from http.cookiejar import MozillaCookieJar
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from youtube_transcript_api._errors import RequestBlocked
-import xml.etree.ElementTree as ET
-from xml.parsers.expat import ExpatError
-from pytube import Playlist
-
-# Shared client and API instances (updated by create_http_client)
-ttp_session: requests.Session | None = None
+import time
+import itertools
+import threading
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+from core.blob_store import BlobStore
+from core.fileio import write_json_atomic
+from core.metrics import get_metrics
+from core.project_manager import settings_for_path
+from core.search_index import SearchIndex
+from core.segments import save_segments, segments_path
+from core.stats_index import StatsIndex
+from core.token_estimator import count_tokens
+from core.transcript_store import TranscriptStore
+
+if TYPE_CHECKING:
+    import requests
+    from youtube_transcript_api import YouTubeTranscriptApi
+    from core.response_cache import ResponseCache
+
+# Shared client and API instances (updated by create_http_client / set_http_client)
+http_session: requests.Session | None = None
 ytt_api: YouTubeTranscriptApi | None = None
+connection_status: dict | None = None
+_client_lock = threading.Lock()
+# Consulted by fetch_transcripts before going to the network (see set_response_cache)
+response_cache: ResponseCache | None = None
 
 
 # Workaround macOS SSL certificate verification issues
@@ -27,20 +48,30 @@ else:
 
 
 # this function creates an HTTP client that attempts to route through Tor and optionally loads browser cookies
-def create_http_client(cookie_file: str = "cookies.txt", use_tor: bool = True) -> tuple[requests.Session, dict]:
+def create_http_client(cookie_file: str = "cookies.txt", use_tor: bool = True,
+                       pool_connections: int = 10, pool_maxsize: int = 32) -> tuple[requests.Session, dict]:
     """
     Create an HTTP client that attempts to route through Tor and optionally loads browser cookies.
     
     Args:
         cookie_file: Path to Netscape-format cookies.txt file
         use_tor: Whether to attempt connecting through Tor
+        pool_connections: Number of per-host connection pools the session keeps
+        pool_maxsize: Keep-alive connections kept per host; should be at least
+            the number of concurrent fetch workers
         
     Returns:
         tuple: (session, status) where status contains connection information
     """
-    global ttp_session, ytt_api
+    global connection_status
+    import requests
+    from http.cookiejar import MozillaCookieJar
+    from requests.adapters import HTTPAdapter
 
     session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
     status = {
         "using_tor": False,
         "connection_type": "direct",
@@ -57,9 +88,9 @@ def create_http_client(cookie_file: str = "cookies.txt", use_tor: bool = True) -
         
         # Test if Tor is available
         try:
-            test_session = requests.Session()
-            test_session.proxies.update(tor_proxies)
-            response = test_session.get("https://check.torproject.org", timeout=5)
+            with requests.Session() as test_session:
+                test_session.proxies.update(tor_proxies)
+                response = test_session.get("https://check.torproject.org", timeout=5)
             
             if "Congratulations" in response.text:
                 session.proxies.update(tor_proxies)
@@ -84,15 +115,33 @@ def create_http_client(cookie_file: str = "cookies.txt", use_tor: bool = True) -
             status["error"] = f"Failed to load cookies: {str(e)}"
 
     # Update the shared session and YouTubeTranscriptApi instance
-    ttp_session = session
-    ytt_api = YouTubeTranscriptApi(http_client=session)
+    set_http_client(session)
+    connection_status = status
 
     return session, status
 
-# Shared HTTP client and Transcript API
+# Make `session` the client used by all fetch functions (e.g. one cached by the UI)
+def set_http_client(session: requests.Session) -> None:
+    global http_session, ytt_api
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    if session is http_session:
+        return
+    http_session = session
+    ytt_api = YouTubeTranscriptApi(http_client=session)
+
+# Serve repeated fetches of a video from `cache` (None turns caching off)
+def set_response_cache(cache: ResponseCache | None) -> None:
+    global response_cache
+    response_cache = cache
 
-http_session, connection_status = create_http_client()
-ytt_api = YouTubeTranscriptApi(http_client=http_session)
+# Shared HTTP client and Transcript API, created with the defaults on first use
+def shared_client() -> tuple[requests.Session, YouTubeTranscriptApi]:
+    if http_session is None:
+        with _client_lock:
+            if http_session is None:
+                create_http_client()
+    return http_session, ytt_api
 
 # Function to extract video ID from URL or ID
 def get_video_id(url_or_id: str) -> str:
@@ -107,66 +156,364 @@ def get_video_id(url_or_id: str) -> str:
             return match.group(1)
     raise ValueError(f"Could not extract a valid video ID from '{url_or_id}'")
 
-# Function to fetch timed text from YouTube
-def fetch_timed_text(video_id: str, language: str = "id") -> list:
-    url = f"http://video.google.com/timedtext?lang={language}&v={video_id}"
-    try:
-        resp = http_session.get(url, timeout=10)
-        if not resp.ok or not resp.text.strip():
+# Playlist ID if the input is a playlist URL, else None. Only /playlist URLs,
+# or list= without a video, count: watch?v=X&list=RD… (a video opened from a
+# mix or playlist) and youtu.be/X?list=… are single videos.
+def get_playlist_id(url: str) -> str | None:
+    parsed = urlparse(url if "://" in url else "https://" + url)
+    query = parse_qs(parsed.query)
+    playlist = query.get("list", [""])[0]
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", playlist):
+        return None
+    if parsed.path.rstrip("/") == "/playlist":
+        return playlist
+    if "v" in query or parsed.netloc.endswith("youtu.be"):
+        return None
+    return playlist
+
+# Raw timed-text endpoint used as a fallback when the transcript API fails
+# Overridable (env var or by assigning the module attribute), e.g. to point at
+# benchmarks/mock_server.py
+TIMEDTEXT_URL = os.environ.get("TRANSCRIPT_TIMEDTEXT_URL", "http://video.google.com/timedtext")
+
+# Chunk size for streamed timed-text responses
+TIMEDTEXT_CHUNK_BYTES = 64 * 1024
+
+class TimedTextParser:
+    """
+    Incremental timed-text XML parser: feed() raw chunks as they arrive and
+    get back the segments completed so far. Parsed <text> elements are
+    dropped right away, so memory stays flat however long the video is.
+    """
+
+    def __init__(self):
+        import xml.etree.ElementTree as ET
+
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+
+    def _drain(self) -> list:
+        segments = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+            if elem.tag != "text":
+                continue
+            segments.append({
+                'text': (elem.text or '').strip().replace("\n", " "),
+                'start': float(elem.attrib.get('start', 0)),
+                'duration': float(elem.attrib.get('dur', 0))
+            })
+        if self._root is not None:
+            self._root.clear()
+        return segments
+
+    def feed(self, chunk: bytes | str) -> list:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> list:
+        """Finish parsing; raises ParseError if the document was truncated or empty."""
+        self._parser.close()
+        return self._drain()
+
+# Function to parse a timed-text XML document (given whole or as chunks) into segments
+def iter_timed_text(chunks: Iterable[bytes | str]) -> Iterator[dict]:
+    parser = TimedTextParser()
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed(chunk)
+    yield from parser.close()
+
+def parse_timed_text(xml_text: str) -> list:
+    return list(iter_timed_text([xml_text]))
+
+# Function to stream timed-text segments from YouTube as the response arrives.
+# Yields nothing if the endpoint has no transcript; request and parse errors
+# propagate to the consumer.
+def stream_timed_text(video_id: str, language: str = "id",
+                      session: requests.Session | None = None) -> Iterator[dict]:
+    with (session or shared_client()[0]).get(TIMEDTEXT_URL, params={"lang": language, "v": video_id},
+                                             timeout=10, stream=True) as resp:
+        if not resp.ok:
+            return
+        chunks = (c for c in resp.iter_content(TIMEDTEXT_CHUNK_BYTES) if c)
+        first = next(chunks, b"")
+        # An empty body means no transcript, not a malformed document
+        while first and not first.strip():
+            first = next(chunks, b"")
+        if not first:
+            return
+        metrics = get_metrics()
+
+        def counted(chunks):
+            for chunk in chunks:
+                metrics.inc("timedtext_response_bytes_total", len(chunk))
+                yield chunk
+
+        yield from iter_timed_text(counted(itertools.chain([first], chunks)))
+
+# Function to fetch timed text from YouTube. The response is parsed as it
+# downloads, so neither the body nor an XML tree is held; the segments are
+# still collected into a list, which the pipeline needs for the response
+# cache, the segments sidecar and multi-language results. Callers that only
+# need the formatted record can pass stream_timed_text() to format_output.
+def fetch_timed_text(video_id: str, language: str = "id",
+                     session: requests.Session | None = None) -> list:
+    import requests
+    import xml.etree.ElementTree as ET
+    from xml.parsers.expat import ExpatError
+
+    with get_metrics().span("fallback", video_id=video_id, language=language) as span:
+        try:
+            segments = list(stream_timed_text(video_id, language, session))
+        except (requests.RequestException, ExpatError, ET.ParseError) as e:
+            print(f"Timed-text fetch failed: {e}")
+            span["outcome"] = "error"
             return []
-        root = ET.fromstring(resp.text)
-    except (requests.RequestException, ExpatError) as e:
-        print(f"Timed-text fetch failed: {e}")
-        return []
-    segments = []
-    for elem in root.findall('text'):
-        text = (elem.text or '').strip().replace("\n", " ")
-        start = float(elem.attrib.get('start', 0))
-        duration = float(elem.attrib.get('dur', 0))
-        segments.append({'text': text, 'start': start, 'duration': duration})
-    return segments
+        span["outcome"] = "ok" if segments else "no-transcript"
+        return segments
 
 # Function to fetch transcript using YouTube Transcript API
 def fetch_transcript(video_id: str, language: str = "id") -> list:
+    segments, _ = fetch_transcript_with_status(video_id, language)
+    return segments
+
+# Language chain entry matching whatever transcript the video has
+# (manually created ones first), e.g. ["id", "en", "auto"]
+AUTO_LANGUAGE = "auto"
+
+def language_chain(languages: str | Sequence[str]) -> list:
+    """Normalize "id", "id,en,auto" or ["id", "en"] to a list of codes."""
+    if isinstance(languages, str):
+        languages = languages.split(",")
+    return [code.strip() for code in languages if code.strip()]
+
+# Pick transcripts from a video's TranscriptList following the preference
+# chain: for each code a manually created transcript wins over a generated
+# one. Returns the first match only, or one per matched language with
+# `all_languages`.
+def resolve_transcripts(transcript_list, languages: Sequence[str],
+                        all_languages: bool = False) -> list:
+    available = list(transcript_list)
+    chosen = []
+    for code in languages:
+        taken = {t.language_code for t in chosen}
+        candidates = [t for t in available
+                      if t.language_code not in taken and code in (AUTO_LANGUAGE, t.language_code)]
+        pick = next((t for t in candidates if not t.is_generated), None) or next(iter(candidates), None)
+        if pick is not None:
+            chosen.append(pick)
+            if not all_languages:
+                break
+    return chosen
+
+# Transcript API only, without the timed-text fallback: one transcript-list
+# lookup per video, then one fetch per chosen language. Returns
+# ([(language_code, segments), ...], status); status is one of "ok",
+# "disabled", "no-transcript", "blocked" or "fallback" (the API's response
+# could not be parsed; try the timed-text endpoint instead).
+def fetch_api_transcripts(video_id: str, languages: str | Sequence[str] = "id",
+                          api: YouTubeTranscriptApi | None = None,
+                          all_languages: bool = False) -> tuple[list, str]:
+    metrics = get_metrics()
+    with metrics.span("fetch", video_id=video_id) as span:
+        results, status = _fetch_api_transcripts(video_id, languages, api, all_languages)
+        span["outcome"] = status
+    for code, segments in results:
+        metrics.inc("transcript_text_bytes_total", sum(len(seg["text"].encode("utf-8")) for seg in segments),
+                    source="api")
+    return results, status
+
+def _fetch_api_transcripts(video_id: str, languages: str | Sequence[str],
+                           api: YouTubeTranscriptApi | None, all_languages: bool) -> tuple[list, str]:
+    import xml.etree.ElementTree as ET
+    from xml.parsers.expat import ExpatError
+    from youtube_transcript_api import TranscriptsDisabled, NoTranscriptFound
+    from youtube_transcript_api._errors import RequestBlocked
+
+    chain = language_chain(languages)
     try:
-        fetched = ytt_api.fetch(video_id, languages=[language])
-        return fetched.to_raw_data()
+        transcript_list = (api or shared_client()[1]).list(video_id)
+        chosen = resolve_transcripts(transcript_list, chain, all_languages)
+        if not chosen:
+            print(f"No transcript found for video {video_id} in {chain}")
+            return [], "no-transcript"
+        return [(t.language_code, t.fetch().to_raw_data()) for t in chosen], "ok"
     except TranscriptsDisabled:
         print(f"Transcripts are disabled for video {video_id}")
-        return []
+        return [], "disabled"
     except NoTranscriptFound:
         print(f"No transcript found for video {video_id}")
-        return []
+        return [], "no-transcript"
     except RequestBlocked:
-        print(f"RequestBlocked for {video_id}, retrying without proxy…")
-        http_session.proxies.clear()
-        try:
-            fetched = ytt_api.fetch(video_id, languages=[language])
-            return fetched.to_raw_data()
-        except Exception as e:
-            print(f"Retry failed: {e}")
+        # Leave the session's proxies alone: retries are paced by the
+        # RequestScheduler (backoff + circuit breaker) instead
+        print(f"RequestBlocked for {video_id}")
+        return [], "blocked"
     # Catch both ExpatError and ElementTree.ParseError
     except (ExpatError, ET.ParseError) as e:
         print(f"XML parse error ({type(e).__name__}), falling back to timed-text…")
+        return [], "fallback"
+
+# Single-language form of fetch_api_transcripts, returning (segments, status)
+def fetch_api_transcript(video_id: str, language: str = "id",
+                         api: YouTubeTranscriptApi | None = None) -> tuple[list, str]:
+    results, status = fetch_api_transcripts(video_id, [language], api)
+    return (results[0][1] if results else []), status
+
+# Same as fetch_api_transcripts, falling back to the timed-text endpoint
+# (tried per language of the chain; it has no "auto") when the API's
+# response can't be parsed. Status is one of "ok", "disabled",
+# "no-transcript" or "blocked".
+def fetch_transcripts_with_status(video_id: str, languages: str | Sequence[str] = "id",
+                                  api: YouTubeTranscriptApi | None = None,
+                                  session: requests.Session | None = None,
+                                  all_languages: bool = False) -> tuple[list, str]:
+    results, status = fetch_api_transcripts(video_id, languages, api, all_languages)
+    if status != "fallback":
+        return results, status
 
     # Fallback to raw timed-text endpoint
-    return fetch_timed_text(video_id, language)
+    results = []
+    for code in language_chain(languages):
+        if code == AUTO_LANGUAGE:
+            continue
+        segments = fetch_timed_text(video_id, code, session)
+        if segments:
+            results.append((code, segments))
+            if not all_languages:
+                break
+    return results, "ok" if results else "no-transcript"
+
+# fetch_transcripts_with_status behind the response cache: a video fetched
+# (with the same language chain) within the cache's TTL is served without
+# any request. Returns (results, status, fetched_at), where fetched_at is
+# when the transcripts were actually downloaded (ISO 8601, UTC).
+def fetch_transcripts(video_id: str, languages: str | Sequence[str] = "id",
+                      api: YouTubeTranscriptApi | None = None,
+                      session: requests.Session | None = None,
+                      all_languages: bool = False) -> tuple[list, str, str | None]:
+    chain = language_chain(languages)
+    hit = cached_transcripts(video_id, chain, all_languages)
+    if hit is not None:
+        return hit
+    if response_cache is not None:
+        get_metrics().inc("response_cache_requests_total", result="miss")
+    results, status = fetch_transcripts_with_status(video_id, chain, api, session, all_languages)
+    if status != "ok":
+        return results, status, None
+    cache = response_cache
+    fetched_ts = cache.put(video_id, chain, results, all_languages) if cache is not None else time.time()
+    return results, status, datetime.fromtimestamp(fetched_ts, timezone.utc).isoformat(timespec="seconds")
+
+# Cache-only lookup for fetch_transcripts: (results, "ok", fetched_at) or None
+def cached_transcripts(video_id: str, languages: str | Sequence[str] = "id",
+                       all_languages: bool = False) -> tuple[list, str, str] | None:
+    cache = response_cache
+    hit = cache.get(video_id, language_chain(languages), all_languages) if cache is not None else None
+    if hit is None:
+        return None
+    get_metrics().inc("response_cache_requests_total", result="hit")
+    results, fetched_ts = hit
+    return results, "ok", datetime.fromtimestamp(fetched_ts, timezone.utc).isoformat(timespec="seconds")
+
+# Same as fetch_transcript, but also reports why nothing was returned.
+# Status is one of "ok", "disabled", "no-transcript" or "blocked".
+# `api`/`session` override the shared client (e.g. one per proxy).
+def fetch_transcript_with_status(video_id: str, language: str = "id",
+                                 api: YouTubeTranscriptApi | None = None,
+                                 session: requests.Session | None = None) -> tuple[list, str]:
+    results, status, _ = fetch_transcripts(video_id, [language], api, session)
+    return (results[0][1] if results else []), status
 
 # Function to format the output
-def format_output(transcript: list, video_id: str) -> dict:
-    raw_content = " ".join(segment['text'] for segment in transcript)
-    token_count = len(raw_content) // 4
+# (`transcript` may be any iterable of segments, e.g. stream_timed_text(), and is read once)
+# (`fetched_at` defaults to now; pass the download time for cached transcripts)
+def format_output(transcript: Iterable[dict], video_id: str, language: str | None = None,
+                  fetched_at: str | None = None) -> dict:
+    with get_metrics().span("format", video_id=video_id):
+        raw_content = " ".join(segment['text'] for segment in transcript)
+        token_count = count_tokens(raw_content)
     url = f"https://www.youtube.com/watch?v={video_id}"
-    return {"raw_content": raw_content, "token_count": token_count, "url": url}
+    return {
+        "raw_content": raw_content,
+        "token_count": token_count,
+        "url": url,
+        "bytes": len(raw_content.encode("utf-8")),
+        "language": language,
+        "fetched_at": fetched_at or datetime.now(timezone.utc).isoformat(timespec="seconds")
+    }
+
+# On-disk layouts for save_output:
+#   "header" - metadata keys first and raw_content last, so readers can get
+#              token_count etc. from the first few hundred bytes
+#   "legacy" - keys in format_output order (raw_content first)
+LAYOUTS = ("header", "legacy")
+
+# Fields that differ between fetches of the same transcript; left out of the
+# blob key so re-fetches share a blob (the file keeps the first fetch's value)
+VOLATILE_FIELDS = ("fetched_at",)
 
 # Function to save the output to a JSON
-def save_output(data: dict, video_id: str, output_dir: str = "output") -> None:
-    os.makedirs(output_dir, exist_ok=True)
+# `storage` picks the backend ("json" files or a compressed "store"); by
+# default it follows the project's settings (see core.project_manager).
+# With `segments` and keep_segments (default: the project's setting), the
+# timed segments are also written next to it in columnar form (core.segments).
+def save_output(data: dict, video_id: str, output_dir: str = "output", layout: str = "header",
+                storage: str | None = None, segments: list | None = None,
+                keep_segments: bool | None = None) -> str:
+    metrics = get_metrics()
+    with metrics.span("save", video_id=video_id):
+        path = _save_output(data, video_id, output_dir, layout, storage, segments, keep_segments)
+    metrics.inc("transcript_saved_total")
+    return path
+
+def _save_output(data: dict, video_id: str, output_dir: str, layout: str, storage: str | None,
+                 segments: list | None, keep_segments: bool | None) -> str:
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}', expected one of {LAYOUTS}")
+    settings = settings_for_path(output_dir)
+    storage = storage or settings["storage"]
+    if keep_segments is None:
+        keep_segments = settings["keep_segments"]
+    if segments is not None and keep_segments:
+        save_segments(segments_path(output_dir, video_id), segments)
+    if storage == "store":
+        store = TranscriptStore.open(output_dir)
+        shard = store.put(video_id, data)
+        search = SearchIndex.for_path(shard)
+        index = StatsIndex.for_path(shard)
+        location = store.locate(video_id) if search is not None or index is not None else None
+        if index is not None and location is not None:
+            index.record_store(output_dir, video_id, location[2], data.get("token_count", 0))
+        if search is not None and location is not None:
+            search.add_record(output_dir, video_id, data, location[0], location[1])
+        print(f"Formatted transcript for {video_id} appended to {shard}")
+        return shard
+    if layout == "header" and "raw_content" in data:
+        data = {k: v for k, v in data.items() if k != "raw_content"} | {"raw_content": data["raw_content"]}
     path = os.path.join(output_dir, f"{video_id}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    blobs = BlobStore.for_path(path)
+    if blobs is not None:
+        # Identical transcripts (same video saved into several playlists or
+        # fetched again later) share one file
+        key = json.dumps({k: v for k, v in data.items() if k not in VOLATILE_FIELDS},
+                         ensure_ascii=False, sort_keys=True).encode("utf-8")
+        blobs.write(path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"), key)
+    else:
+        write_json_atomic(path, data, ensure_ascii=False, indent=2)
+    # Keep the dashboard stats index (if this tree has one) in sync
+    index = StatsIndex.for_path(path)
+    if index is not None:
+        index.record(path, data.get("token_count", 0))
+    search = SearchIndex.for_path(path)
+    if search is not None:
+        search.add_file(path, video_id, data)
     print(f"Formatted transcript saved to {path}")
-
+    return path
 
 def main():
     print("YouTube Transcript Scraper — type 'exit' or 'quit' to stop")
@@ -177,31 +524,26 @@ def main():
             break
 
         # Playlist support
-        if "playlist" in user_input and "list=" in user_input:
-            m = re.search(r"list=([A-Za-z0-9_-]+)", user_input)
-            if not m:
-                print("Could not extract playlist ID.")
-                continue
-            playlist_id = m.group(1)
+        playlist_id = get_playlist_id(user_input)
+        if playlist_id:
             playlist_url = user_input.split("&si=")[0]
+            out_dir = os.path.join("output", playlist_id)
+            # Imported here: the engine module itself imports this one
+            from core.fetch_engine import run_fetches
+            from core.manifest import PlaylistManifest
+            from core.playlist_cache import PlaylistCache, prefetch
+            from core.scheduler import RequestScheduler
+            manifest = PlaylistManifest(out_dir, playlist_id)
+            video_ids = prefetch(PlaylistCache(out_dir, playlist_id).iter_video_ids(playlist_url))
             try:
-                pl = Playlist(playlist_url)
+                for result in run_fetches(video_ids, out_dir, manifest=manifest,
+                                          scheduler=RequestScheduler()):
+                    if result["status"] == "no-transcript":
+                        print(f"No transcript for {result['video_id']}")
+                    elif result["status"] in ("failed", "blocked"):
+                        print(f"{result['status'].capitalize()} {result['video_id']}: {result['error']}")
             except Exception as e:
                 print(f"Error reading playlist: {e}")
-                continue
-            out_dir = os.path.join("output", playlist_id)
-            for video_url in pl.video_urls:
-                try:
-                    vid = get_video_id(video_url)
-                except ValueError as e:
-                    print(e)
-                    continue
-                transcript = fetch_transcript(vid)
-                if not transcript:
-                    print(f"No transcript for {vid}")
-                    continue
-                data = format_output(transcript, vid)
-                save_output(data, vid, out_dir)
             continue
 
         # Single video support
@@ -215,7 +557,7 @@ def main():
             print("No transcript to save.")
             continue
         data = format_output(transcript, vid)
-        save_output(data, vid)
+        save_output(data, vid, segments=transcript)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,176 @@
+# core/transcript_store.py
+import os
+import gzip
+import json
+import threading
+from typing import Iterator, Optional
+
+from core.db import connect
+from core.fileio import file_lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    video_id    TEXT PRIMARY KEY,
+    shard       TEXT NOT NULL,
+    offset      INTEGER NOT NULL,
+    length      INTEGER NOT NULL,    -- compressed bytes on disk
+    token_count INTEGER NOT NULL,
+    url         TEXT
+);
+"""
+
+
+class TranscriptStore:
+    """
+    Append-only transcript storage for one output directory: records are
+    packed into gzip-compressed JSONL shards under `<directory>/.store/`,
+    one gzip member per record, so shards stream with gzip.open() and any
+    record can be read back alone from its (shard, offset, length) entry in
+    the SQLite index. Saving a video again appends a new record and
+    repoints the index; older copies are simply never read.
+
+    Appends are serialized across threads (one instance per directory) and
+    across processes (a file lock on `.store/append.lock`), so the app and
+    any number of job workers can write to the same store.
+    """
+
+    DIRNAME = ".store"
+    INDEX_NAME = "index.sqlite"
+    LOCK_NAME = "append.lock"
+    SHARD_MAX_BYTES = 64 * 1024 * 1024
+
+    # One instance per directory so worker threads share the append lock
+    _instances: dict = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.root = os.path.join(directory, self.DIRNAME)
+        self.index_path = os.path.join(self.root, self.INDEX_NAME)
+        self.lock_path = os.path.join(self.root, self.LOCK_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, directory: str) -> "TranscriptStore":
+        key = os.path.abspath(directory)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls._instances[key] = cls(directory)
+            return store
+
+    @classmethod
+    def exists_in(cls, directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, cls.DIRNAME, cls.INDEX_NAME))
+
+    def _connect(self):
+        # Default rollback journal (not WAL) so every commit touches the index
+        # file's mtime, which the stats index uses to notice changes
+        return connect(self.index_path, wal=False)
+
+    def _current_shard(self) -> str:
+        shards = sorted(fn for fn in os.listdir(self.root) if fn.endswith(".jsonl.gz"))
+        if shards:
+            path = os.path.join(self.root, shards[-1])
+            if os.path.getsize(path) < self.SHARD_MAX_BYTES:
+                return path
+            number = int(shards[-1].split("-")[1].split(".")[0]) + 1
+        else:
+            number = 0
+        return os.path.join(self.root, f"shard-{number:05d}.jsonl.gz")
+
+    def put(self, video_id: str, data: dict) -> str:
+        """Append a transcript record and index it. Returns the shard path."""
+        line = json.dumps({"video_id": video_id, **data}, ensure_ascii=False) + "\n"
+        member = gzip.compress(line.encode("utf-8"))
+        # Shard choice, append and index entry must not interleave with
+        # another writer's, or the recorded offset points into its record
+        with self._lock, file_lock(self.lock_path):
+            shard = self._current_shard()
+            with open(shard, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_id, os.path.basename(shard), offset, len(member),
+                     int(data.get("token_count", 0)), data.get("url"))
+                )
+        return shard
+
+    def _read(self, shard: str, offset: int, length: int) -> dict:
+        with open(os.path.join(self.root, shard), "rb") as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    def get(self, video_id: str) -> Optional[dict]:
+        """Return the latest record for `video_id`, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT shard, offset, length FROM records WHERE video_id = ?",
+                               (video_id,)).fetchone()
+        return self._read(*row) if row else None
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM records WHERE video_id = ?",
+                                (video_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def video_ids(self) -> set:
+        """IDs of every video with a record, in one query."""
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute("SELECT video_id FROM records")}
+
+    def locate(self, video_id: str) -> Optional[tuple]:
+        """(shard, offset, length) of the latest record for `video_id`, or None."""
+        with self._connect() as conn:
+            return conn.execute("SELECT shard, offset, length FROM records WHERE video_id = ?",
+                                (video_id,)).fetchone()
+
+    def iter_locations(self) -> Iterator[tuple]:
+        """(video_id, shard, offset, length) for every live record."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT video_id, shard, offset, length FROM records ORDER BY video_id"
+            ).fetchall()
+        yield from rows
+
+    def iter_metadata(self) -> Iterator[tuple]:
+        """(video_id, compressed_length, token_count, url) for every live record."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT video_id, length, token_count, url FROM records ORDER BY video_id"
+            ).fetchall()
+        yield from rows
+
+    def iter_records(self) -> Iterator[dict]:
+        """
+        Stream every live record (latest version per video) in storage order,
+        reading each shard sequentially.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT shard, offset, length FROM records ORDER BY shard, offset"
+            ).fetchall()
+        handle, open_shard = None, None
+        try:
+            for shard, offset, length in rows:
+                if shard != open_shard:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(os.path.join(self.root, shard), "rb")
+                    open_shard = shard
+                handle.seek(offset)
+                yield json.loads(gzip.decompress(handle.read(length)))
+        finally:
+            if handle is not None:
+                handle.close()